@@ -88,8 +88,8 @@ def summary_plots(test_level_value, base_probability_value, level_scaling_value,
     mpl_pane_1 = pn.pane.Matplotlib(fig1, height=400)
     # Experience for T5
     fig2, ax2 = plt.subplots(1, 2, figsize=(14, 6))
-    old_array = np.array([old_aug.mean_experience(5, c_lvl) for c_lvl in character_levels])
-    new_array = np.array([new_aug.mean_experience(5, c_lvl) for c_lvl in character_levels])
+    old_array = old_aug.mean_experience(5, character_levels)
+    new_array = new_aug.mean_experience(5, character_levels)
     ax2[0].plot(character_levels, old_array, label="Old")
     ax2[0].plot(character_levels, new_array, label="New")
     ax2[0].set_xlabel("Character Level")
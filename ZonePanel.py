@@ -1,8 +1,11 @@
 import panel as pn
 from panel.template import DarkTheme
-from idlescape.dashboard import InteractiveCharacter, ActionSummary, BalanceEditor
+import idlescape
+from idlescape import profiling
+from idlescape.dashboard import InteractiveCharacter, ActionSummary, BalanceEditor, ProfilingPanel
 
 pn.config.throttled = True
+idlescape.warmup()
 player_character = InteractiveCharacter()
 action_selector = pn.widgets.Select(name='Action', options={'Mining': player_character.mining,
                                                             'Foraging': player_character.foraging,
@@ -36,6 +39,8 @@ enchant_column = pn.Column(*(player_character.enchant_widgets()))
 selection_tabs = pn.Tabs(('Action', selection_column), ('Character', stats_column), ('Equipment', equipment_column),
                          ('Enchants', enchant_column))
 main_tabs = pn.Tabs(('Zone Summary', interactive_plot))
+if profiling.enabled():
+    main_tabs.append(('Profiling', ProfilingPanel().view()))
 
 template = pn.template.FastListTemplate(
     title='Idlescape',
@@ -1,10 +1,75 @@
-from .character import Character
-from .gathering import Location, Node, NodeLoot
-from .fishing import Fishing
-from .foraging import Foraging
-from .mining import Mining
-from .augmenting import Augmenting
-from .sequencer import *
-from .combat import *
-from .smithing import *
-from .dashboard import *
+"""
+Idlescape models. Classes and submodules are imported on first access, so ``import idlescape`` stays
+cheap and numba (fishing) or panel / hvplot (dashboard) are only loaded when something needs them.
+"""
+import importlib
+import threading
+
+_lazy_attributes = {
+    "Character": ".character",
+    "CharacterOverlay": ".character",
+    "Location": ".gathering",
+    "Node": ".gathering",
+    "NodeLoot": ".gathering",
+    "Fishing": ".fishing",
+    "Foraging": ".foraging",
+    "Mining": ".mining",
+    "Augmenting": ".augmenting",
+    "Sequencer": ".sequencer",
+    "ExperienceTable": ".sequencer",
+    "RSExperienceTable": ".sequencer",
+    "Combat": ".combat",
+    "Combatant": ".combat",
+    "CombatantBatch": ".combat",
+    "Ability": ".combat",
+    "Smithing": ".smithing",
+    "InteractiveCharacter": ".dashboard",
+    "ActionSummary": ".dashboard",
+    "BalanceEditor": ".dashboard",
+    "ProfilingPanel": ".dashboard",
+}
+_submodules = ["augmenting", "bench", "character", "combat", "cooking", "crafting", "dashboard", "datastore",
+               "equipment", "fishing", "foraging", "gathering", "itemtable", "litemodel", "mining", "profiling",
+               "sequencer", "smithing", "utilities"]
+
+# The dashboard classes are left out so a star import does not load panel
+__all__ = [name for (name, module) in _lazy_attributes.items() if module != ".dashboard"] + ["datastore"]
+
+
+def __getattr__(name):
+    if name in _lazy_attributes:
+        value = getattr(importlib.import_module(_lazy_attributes[name], __name__), name)
+    elif name in _submodules:
+        value = importlib.import_module(f".{name}", __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_attributes) | set(_submodules))
+
+
+def warmup(**kwargs):
+    """
+    Load or compile the numba kernels ahead of the first calculation, e.g. at server start.
+    Runs in a daemon thread (returned) unless background=False.
+    """
+    def load_kernels():
+        importlib.import_module(".fishing", __name__).warmup()
+        importlib.import_module(".combat", __name__).warmup()
+
+    if not kwargs.get("background", True):
+        load_kernels()
+        return None
+    try:
+        # Start the numba thread pool from this thread, the tbb layer hangs at exit when a
+        # short-lived thread starts it
+        import numba
+        numba.get_num_threads()
+    except ImportError:
+        pass
+    thread = threading.Thread(target=load_kernels, name="idlescape-warmup", daemon=True)
+    thread.start()
+    return thread
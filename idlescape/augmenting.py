@@ -17,9 +17,27 @@ class Augmenting:
     old_chances = 0.06
     tool_bonus = 0
     level_weight = 1.0
+    parameter_names = ("base_probability", "level_scaling", "level_norm", "level_weight", "tool_bonus", "exp_scale",
+                       "exp_tier_power", "exp_level_power", "old_chances")
 
-    def __init__(self):
-        pass
+    def __init__(self, **kwargs):
+        for name in self.parameter_names:
+            if name in kwargs:
+                setattr(self, name, kwargs[name])
+
+    @classmethod
+    def batch(cls, parameters):
+        """
+        One instance holding many parameter sets (dict or DataFrame of name -> value per candidate), anything not
+        given keeps its default. The candidates broadcast along a leading axis, so with a 1-D array of character
+        levels probability_distribution gives (candidates, levels, x_values) and mean_experience (candidates, levels).
+        """
+        unknown = set(parameters.keys()) - set(cls.parameter_names)
+        if unknown:
+            raise ValueError(f"Unknown Augmenting parameters {sorted(unknown)}")
+        names = list(parameters.keys())
+        values = np.broadcast_arrays(*[np.asarray(parameters[name], dtype=float).ravel() for name in names])
+        return cls(**{name: value[:, None, None] for (name, value) in zip(names, values)})
 
     def single_probability(self, item_level, character_level):
         character_level = character_level + self.tool_bonus
@@ -29,20 +47,28 @@ class Augmenting:
     def experience_formula(self, item_tier, target_level):
         return self.exp_scale * item_tier**self.exp_tier_power * target_level**self.exp_level_power
 
+    def success_chances(self, character_level):
+        """
+        Chance of each augment in x_values succeeding, clipped to [0, 1], shape character_level.shape + x_values.shape
+        """
+        character_level = np.asarray(character_level, dtype=float)
+        return np.clip(self.single_probability(self.x_values, character_level[..., None]), 0, 1)
+
     def probability_distribution(self, character_level, attempts=1):
-        p_at_x = self.single_probability(self.x_values, character_level)
-        p_at_x[p_at_x > 1] = 1
-        p_at_x[p_at_x < 0] = 0
-        cum_prod = np.cumprod(p_at_x)
+        """
+        Chance of the item breaking on each augment in x_values, along the last axis, for a character level or an
+        array of them (e.g. np.arange(1, 201) gives a 200 x 51 table)
+        """
+        cum_prod = np.cumprod(self.success_chances(character_level), axis=-1)
         cum_failure = 1 - cum_prod
         cum_failure = cum_failure ** attempts
-        failure_pdf = cum_failure - np.roll(cum_failure, 1)
-        failure_pdf[0] = 0
-        failure_pdf = failure_pdf / np.sum(failure_pdf)
+        failure_pdf = np.diff(cum_failure, axis=-1, prepend=0)
+        failure_pdf[..., 0] = 0
+        failure_pdf = failure_pdf / np.sum(failure_pdf, axis=-1, keepdims=True)
 
         # Statistics
-        mean = np.sum(self.x_values * failure_pdf)
-        variance = np.sum((self.x_values - mean)**2 * failure_pdf)**0.5
+        mean = np.sum(self.x_values * failure_pdf, axis=-1)
+        variance = np.sum((self.x_values - mean[..., None])**2 * failure_pdf, axis=-1)**0.5
         return_statistics = {
             "mean": mean,
             "variance": variance,
@@ -53,27 +79,31 @@ class Augmenting:
         return failure_pdf, return_statistics
 
     def mean_augment(self, character_levels):
-        if not isinstance(character_levels, np.ndarray):
-            character_levels = np.array([character_levels])
-        mean_array = np.array([
-            self.probability_distribution(clvl)[1]["mean"] for clvl in character_levels
-        ])
-        return mean_array
+        return np.atleast_1d(self.probability_distribution(character_levels)[1]["mean"])
 
     def mean_cost(self, character_level, base_cost, augment_cost):
+        """
+        Mean cost of an item at each target level in x_values, along the last axis, inf for targets that
+        can not be reached
+        """
         failure_pdf, statistics = self.probability_distribution(character_level)
-        attempts = (np.cumsum(np.roll(failure_pdf[::-1], 1))[::-1])
-        base_cost_component = base_cost / attempts
-        p_at_x = self.single_probability(self.x_values, character_level)
-        p_at_x[p_at_x > 1] = 1
-        p_at_x[p_at_x < 0] = 0
-        cum_prod = np.cumprod(p_at_x)
-        aug_cost_component = np.array([np.sum(cum_prod[:target]) for target in self.x_values]) / attempts * augment_cost
-        return base_cost_component + aug_cost_component
+        # Chance of reaching each target
+        attempts = np.flip(np.cumsum(np.roll(np.flip(failure_pdf, axis=-1), 1, axis=-1), axis=-1), axis=-1)
+        # Expected augments paid on the way to each target
+        cum_prod = statistics["cum_product"]
+        augments = np.cumsum(cum_prod, axis=-1) - cum_prod
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cost = (base_cost + augments * augment_cost) / attempts
+        return np.where(attempts > 0, cost, np.inf)
 
     def mean_cost_target(self, target_level, character_level, base_cost, augment_cost):
-        failure_pdf, statistics = self.probability_distribution(character_level)
-        new_failure_pdf = failure_pdf[0:(target_level+1)]
+        """
+        Mean cost of an item at target_level, all arguments broadcast
+        """
+        target_level, character_level, base_cost, augment_cost = np.broadcast_arrays(
+            target_level, character_level, base_cost, augment_cost)
+        costs = self.mean_cost(character_level, base_cost[..., None], augment_cost[..., None])
+        return np.take_along_axis(costs, target_level[..., None], axis=-1)[..., 0][()]
 
     def soulbind_cost(self, base_cost, augment_cost):
         base_mods = []
@@ -87,42 +117,231 @@ class Augmenting:
         return total_base_cost + total_aug_cost
 
     def mean_experience(self, item_tier, character_level):
+        """
+        Mean experience per augment, item_tier and character_level broadcast
+        """
         failure_pdf, statistics = self.probability_distribution(character_level)
-        experience_curve = self.experience_formula(item_tier, self.x_values)
-        total_experience = np.sum(statistics['cum_product'] * experience_curve)
+        return self._mean_experience(item_tier, statistics)[()]
+
+    def _mean_experience(self, item_tier, statistics):
+        experience_curve = self.experience_formula(np.asarray(item_tier)[..., None], self.x_values)
+        total_experience = np.sum(statistics['cum_product'] * experience_curve, axis=-1)
         return total_experience / statistics['mean']
 
     # Simulations
-    def simulate_pdf(self, character_level, attempts=1):
-        trials = 10000
-        final_values = []
-        for t in range(trials):
-            item_level = 0
-            broken = False
-            while not broken:
-                chance = self.single_probability(item_level+1, character_level)
-                if np.random.rand() < chance:
-                    item_level += 1
-                else:
-                    final_values.append(item_level)
-                    broken = True
-        return np.array(final_values)
-
-    def simulate_cost(self, target_level, character_level, base_cost, augment_cost):
-        trials = 10000
-        successes = 0
-        total_cost = 0
-        for t in range(trials):
-            total_cost += base_cost
-            item_level = 0
-            broken = False
-            while (not broken) and (item_level < target_level):
-                chance = self.single_probability(item_level+1, character_level)
-                total_cost += augment_cost
-                if np.random.rand() < chance:
-                    item_level += 1
-                else:
-                    broken = True
-            if item_level >= target_level:
-                successes += 1
-        return total_cost / successes
+    def simulate_batch(self, character_level, **kwargs):
+        """
+        Augment fresh items until they break, for every character level at once. Trials advance one item level
+        per pass, drawing the attempts of all surviving trials as one array.
+
+        Parameters
+        ----------
+        character_level : float or array
+        target_level : int or array, optional
+            Stop a trial once it reaches this level (broadcast against character_level), no target by default
+        trials : int, trials per character level (10000)
+        seed : int or numpy.random.Generator, optional
+        max_level : int, trials still going at this level stop there (1000)
+
+        Returns
+        -------
+        (final_level, attempts) : int arrays of shape broadcast(character_level, target_level) + (trials,)
+        """
+        trials = kwargs.get("trials", 10000)
+        target_level = kwargs.get("target_level", None)
+        max_level = kwargs.get("max_level", 1000)
+        rng = np.random.default_rng(kwargs.get("seed", None))
+        character_level, target_level = np.broadcast_arrays(
+            np.asarray(character_level, dtype=float), np.inf if target_level is None else np.asarray(target_level))
+        shape = character_level.shape + (trials,)
+        character_level = character_level.ravel()
+        target_level = np.minimum(target_level.ravel(), max_level)
+        final_level = np.zeros(character_level.size * trials, dtype=np.int64)
+        attempts = np.zeros(character_level.size * trials, dtype=np.int64)
+        # Surviving trials (flat index), all of them at the same item level
+        active = np.flatnonzero(np.repeat(target_level > 0, trials))
+        item_level = 0
+        while active.size > 0:
+            chance = self.single_probability(item_level + 1, character_level)[active // trials]
+            attempts[active] += 1
+            active = active[rng.random(active.size) < chance]
+            item_level += 1
+            final_level[active] = item_level
+            active = active[target_level[active // trials] > item_level]
+        return final_level.reshape(shape), attempts.reshape(shape)
+
+    def simulate_histogram(self, character_level, **kwargs):
+        """
+        Simulated fraction of items ending at each of x_values (the last bin holds everything above),
+        shape character_level.shape + x_values.shape. probability_distribution counts the failed attempt
+        instead, so histogram[x] matches its pdf[x + 1].
+        Takes the simulate_batch keyword arguments.
+        """
+        final_level, attempts = self.simulate_batch(character_level, **kwargs)
+        bins = np.minimum(final_level, len(self.x_values) - 1)
+        rows = bins.reshape(-1, bins.shape[-1])
+        counts = np.zeros((rows.shape[0], len(self.x_values)))
+        np.add.at(counts, (np.arange(rows.shape[0])[:, None], rows), 1)
+        return (counts / bins.shape[-1]).reshape(bins.shape[:-1] + self.x_values.shape)
+
+    def simulate_cost_distribution(self, target_level, character_level, base_cost, augment_cost, **kwargs):
+        """
+        Simulated cost of every item that reached target_level, counting the items broken on the way.
+        Costs are packed at the front of the last axis, padded with nan once a character level runs out of
+        successes, so np.nanmean gives the mean cost. All arguments broadcast.
+        Takes the simulate_batch keyword arguments.
+        """
+        target_level, character_level, base_cost, augment_cost = np.broadcast_arrays(
+            target_level, character_level, base_cost, augment_cost)
+        final_level, attempts = self.simulate_batch(character_level, target_level=target_level, **kwargs)
+        cost = base_cost[..., None] + augment_cost[..., None] * attempts
+        success = final_level >= target_level[..., None]
+        # Running total at every success, moved to the front in order, then split into costs per success
+        paid = np.where(success, np.cumsum(cost, axis=-1), np.nan)
+        order = np.argsort(~success, axis=-1, kind='stable')
+        paid = np.take_along_axis(paid, order, axis=-1)
+        return np.diff(paid, axis=-1, prepend=0)
+
+    def simulate_pdf(self, character_level, attempts=1, **kwargs):
+        """
+        Final item level of 10000 (trials=) simulated items
+        """
+        return self.simulate_batch(character_level, **kwargs)[0]
+
+    def simulate_cost(self, target_level, character_level, base_cost, augment_cost, **kwargs):
+        """
+        Mean simulated cost of an item at target_level, from 10000 (trials=) items
+        """
+        target_level, character_level, base_cost, augment_cost = np.broadcast_arrays(
+            target_level, character_level, base_cost, augment_cost)
+        final_level, attempts = self.simulate_batch(character_level, target_level=target_level, **kwargs)
+        successes = np.sum(final_level >= target_level[..., None], axis=-1)
+        total_cost = np.sum(base_cost[..., None] + augment_cost[..., None] * attempts, axis=-1)
+        return (total_cost / successes)[()]
+
+
+def latin_hypercube(bounds, samples, **kwargs):
+    """
+    Latin hypercube sample of parameter sets, bounds is {name: (low, high)}.
+    Returns {name: array of samples}, ready for Augmenting.batch. seed= makes it reproducible.
+    """
+    rng = np.random.default_rng(kwargs.get("seed", None))
+    result = dict()
+    for (name, (low, high)) in bounds.items():
+        strata = (rng.permutation(samples) + rng.random(samples)) / samples
+        result[name] = low + strata * (high - low)
+    return result
+
+
+def evaluate_parameters(parameters, character_levels, **kwargs):
+    """
+    Analytic curves of many parameter sets in one batched pass.
+
+    Parameters
+    ----------
+    parameters : dict or DataFrame
+        Parameter name -> one value per candidate, the others keep the Augmenting defaults
+    character_levels : 1-D array
+    item_tier : experience curve tier (5)
+    cost_level : character level(s) of the cost curves (100)
+    base_cost, augment_cost : cost curve prices (1.0, 0.1)
+    chunk : candidates evaluated at a time, small enough to keep the arrays in cache (32)
+
+    Returns
+    -------
+    dict
+        mean_augment (candidates, levels), mean_experience (candidates, levels) and
+        mean_cost (candidates, cost levels, x_values), mean cost of an item at each target level
+    """
+    item_tier = kwargs.get("item_tier", 5)
+    cost_level = np.atleast_1d(kwargs.get("cost_level", 100))
+    base_cost = kwargs.get("base_cost", 1.0)
+    augment_cost = kwargs.get("augment_cost", 0.1)
+    chunk = kwargs.get("chunk", 32)
+    character_levels = np.atleast_1d(np.asarray(character_levels, dtype=float))
+    # A single default candidate when no parameters are given
+    names = list(parameters.keys()) or ["base_probability"]
+    values = np.broadcast_arrays(*[np.asarray(parameters.get(name, getattr(Augmenting, name)), dtype=float).ravel()
+                                   for name in names])
+    candidates = len(values[0])
+    results = {"mean_augment": [], "mean_experience": [], "mean_cost": []}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for start in range(0, candidates, chunk):
+            model = Augmenting.batch({name: value[start:start + chunk] for (name, value) in zip(names, values)})
+            failure_pdf, statistics = model.probability_distribution(character_levels)
+            results["mean_augment"].append(statistics["mean"])
+            results["mean_experience"].append(model._mean_experience(item_tier, statistics))
+            results["mean_cost"].append(model.mean_cost(cost_level, base_cost, augment_cost))
+    return {name: np.concatenate(curves) for (name, curves) in results.items()}
+
+
+def _curve_errors(curves, target):
+    # Sum of squared differences over the finite target points, candidates along the first axis
+    target = np.asarray(target, dtype=float)
+    mask = np.isfinite(target)
+    curves = curves.reshape((len(curves),) + target.shape)
+    errors = np.sum((curves[:, mask] - target[mask]) ** 2, axis=-1)
+    return np.where(np.isnan(errors), np.inf, errors)
+
+
+def fit_parameters(target, bounds, character_levels, **kwargs):
+    """
+    Search for the parameters (within bounds, {name: (low, high)}) whose curve best matches target in
+    the least squares sense. A Latin hypercube of candidates is screened in one batch, then the best one is
+    polished with nlopt (LN_SBPLX) when it is installed, or else with hypercubes over a shrinking box.
+
+    Parameters
+    ----------
+    target : array, the curve to match, non-finite points are ignored
+    bounds : dict
+    character_levels : 1-D array
+    quantity : 'mean_augment' (default), 'mean_experience' or 'mean_cost', the curve compared to target
+    candidates : candidates per hypercube (10000)
+    rounds : shrinking hypercube rounds without nlopt (4)
+    seed : int, optional
+    Other keyword arguments are passed on to evaluate_parameters.
+
+    Returns
+    -------
+    (parameters, error) : best {name: value} and its sum of squared errors
+    """
+    quantity = kwargs.pop("quantity", "mean_augment")
+    candidates = kwargs.pop("candidates", 10000)
+    rounds = kwargs.pop("rounds", 4)
+    rng = np.random.default_rng(kwargs.pop("seed", None))
+    names = list(bounds.keys())
+    low = np.array([bounds[name][0] for name in names], dtype=float)
+    high = np.array([bounds[name][1] for name in names], dtype=float)
+
+    def screen(box_low, box_high):
+        sample = latin_hypercube(dict(zip(names, zip(box_low, box_high))), candidates, seed=rng)
+        errors = _curve_errors(evaluate_parameters(sample, character_levels, **kwargs)[quantity], target)
+        best = int(np.argmin(errors))
+        return np.array([sample[name][best] for name in names]), errors[best]
+
+    best, error = screen(low, high)
+    try:
+        import nlopt
+    except ImportError:
+        nlopt = None
+    if nlopt is not None:
+        def _objective(x, grad):
+            curves = evaluate_parameters(dict(zip(names, x)), character_levels, **kwargs)[quantity]
+            return float(_curve_errors(curves, target)[0])
+
+        opt = nlopt.opt(nlopt.LN_SBPLX, len(names))
+        opt.set_lower_bounds(low)
+        opt.set_upper_bounds(high)
+        opt.set_min_objective(_objective)
+        opt.set_xtol_rel(1e-6)
+        polished = opt.optimize(best)
+        if opt.last_optimum_value() < error:
+            best, error = polished, opt.last_optimum_value()
+    else:
+        width = high - low
+        for r in range(rounds):
+            width = width / 4
+            candidate, candidate_error = screen(np.maximum(best - width / 2, low), np.minimum(best + width / 2, high))
+            if candidate_error < error:
+                best, error = candidate, candidate_error
+    return {name: float(value) for (name, value) in zip(names, best)}, float(error)
@@ -0,0 +1,236 @@
+"""
+Timings of the model hot paths, with fixed seeds and the bundled data files.
+
+    python -m idlescape.bench [--repeat 5] [--backend numba cpp numpy] [--only fishing] [--output bench.json]
+
+Results are written as JSON (stdout by default). Fishing benchmarks are repeated for every requested
+simulation backend so the numba, C++ and numpy kernels can be compared, everything else runs once.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import time
+import numpy as np
+from . import datastore
+from . import fishing
+from .augmenting import Augmenting
+from .character import Character
+from .fishing import Fishing
+from .foraging import Foraging
+from .mining import Mining
+from .sequencer import Sequencer
+from .smithing import Smithing
+
+SEED = 42
+FISHING_ACCURACIES = [None, 1000, 10000, 100000]
+
+
+def _locations():
+    return datastore.data_file("locations.json")
+
+
+def _character():
+    return Character(mining_level=90, mining_bonus=30, foraging_level=90, foraging_bonus=30, fishing_level=90,
+                     fishing_bonus=30, bait_power=40, reel_power=30, bonus_rarity=5, smithing_level=70,
+                     enchantments={'haste': 2, 'gathering': 2})
+
+
+def _setup_character():
+    return lambda: Character()
+
+
+def _setup_zone_action_rate(accuracy):
+    def setup():
+        action = Fishing(_character(), _locations(), monte_carlo=accuracy is not None, accuracy=accuracy or 10000,
+                         seed=SEED)
+        return lambda: [action.zone_action_rate(name) for name in action.list_of_actions()]
+    return setup
+
+
+def _parallel_counts():
+    counts = [1]
+    while counts[-1] * 2 <= (os.cpu_count() or 1):
+        counts.append(counts[-1] * 2)
+    return counts
+
+
+def _setup_parallel_sampling(threads):
+    # Numba threads, or process pool workers for the numpy backend. None samples serially
+    def setup():
+        def call():
+            numba_threads = None
+            if (threads is not None) and (fishing.get_backend() == "numba"):
+                import numba
+                numba_threads = numba.get_num_threads()
+                numba.set_num_threads(threads)
+            try:
+                fishing._sample_node_resources_fishing(20, 5, 10, 90, 40, 1000000, SEED, parallel=threads is not None,
+                                                       workers=threads)
+            finally:
+                if numba_threads is not None:
+                    numba.set_num_threads(numba_threads)
+        return call
+    return setup
+
+
+def _setup_histogram(action_class):
+    def setup():
+        action = action_class(_character(), _locations())
+        return lambda: [action.location_item_histogram(name) for name in action.list_of_actions()]
+    return setup
+
+
+def _setup_sequencer():
+    sequence = [
+        {'level': 20, 'mining_bonus': 20, 'info': 'iron tool'},
+        {'level': 60, 'mining_bonus': 40, 'info': 'adamantite tool'},
+        {'hours': 50, 'enchantments:haste': 3, 'info': 'haste scroll'},
+    ]
+    sequencer = Sequencer(Mining(Character(), _locations()), sequence=sequence)
+    return lambda: sequencer.simulate_by_time(np.linspace(0, 200, 201))
+
+
+def _setup_simulate_pdf():
+    augmenting = Augmenting()
+    return lambda: augmenting.simulate_pdf(50, seed=SEED)
+
+
+def _setup_simulate_batch():
+    augmenting = Augmenting()
+    return lambda: augmenting.simulate_batch(np.arange(1, 201), trials=10000, seed=SEED)
+
+
+def _setup_mean_cost():
+    augmenting = Augmenting()
+    return lambda: [augmenting.mean_cost(level, 1000, 50) for level in range(1, 101)]
+
+
+def _setup_mean_cost_grid():
+    augmenting = Augmenting()
+    return lambda: augmenting.mean_cost(np.arange(1, 201), 1000, 50)
+
+
+def _setup_smithing():
+    player = _character()
+    forge = Smithing(player, datastore.data_file("forges.json"))
+    bars = [k for (k, v) in player.item_data.items()
+            if v.get('class') == 'bar' and all(field in v for field in ['time', 'experience', 'requiredResources'])]
+    return lambda: [forge.information(select, bar, intensity) for select in forge.forges for bar in bars
+                    for intensity in range(1, 13)]
+
+
+def _setup_crafting():
+    from .utilities.craftingexperience import CraftingExperience
+    crafting = CraftingExperience(datastore.data_file("items.json"))
+    return lambda: crafting.estimate_item_xp()
+
+
+def benchmarks():
+    """
+    (name, parameters, setup) of every benchmark, setup returns the callable being timed
+    """
+    suite = [("Character", {}, _setup_character)]
+    for accuracy in FISHING_ACCURACIES:
+        suite.append(("Fishing.zone_action_rate", {"accuracy": accuracy}, _setup_zone_action_rate(accuracy)))
+    for threads in [None] + _parallel_counts():
+        suite.append(("Fishing.sample_node_resources", {"trials": 1000000, "threads": threads},
+                      _setup_parallel_sampling(threads)))
+    for action_class in [Mining, Foraging, Fishing]:
+        suite.append((f"{action_class.__name__}.location_item_histogram", {}, _setup_histogram(action_class)))
+    suite += [
+        ("Sequencer.simulate_by_time", {}, _setup_sequencer),
+        ("Augmenting.simulate_pdf", {}, _setup_simulate_pdf),
+        ("Augmenting.simulate_batch", {"levels": 200, "trials": 10000}, _setup_simulate_batch),
+        ("Augmenting.mean_cost", {}, _setup_mean_cost),
+        ("Augmenting.mean_cost", {"levels": 200}, _setup_mean_cost_grid),
+        ("Smithing.information", {}, _setup_smithing),
+        ("CraftingExperience.estimate_item_xp", {}, _setup_crafting),
+    ]
+    return suite
+
+
+def time_benchmark(setup, repeat):
+    """
+    Time a fresh setup() call repeat times after one warm-up run, whose time (including any compilation)
+    is reported separately as first
+    """
+    times = []
+    for r in range(repeat + 1):
+        np.random.seed(SEED)
+        call = setup()
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+    repeats = np.array(times[1:])
+    return {
+        "first": times[0],
+        "best": float(np.min(repeats)),
+        "mean": float(np.mean(repeats)),
+        "std": float(np.std(repeats)),
+        "times": repeats.tolist(),
+    }
+
+
+def run(**kwargs):
+    """
+    Run the suite and return the results as a json-ready dict.
+
+    Parameters
+    ----------
+    repeat : int
+    backends : list of str, fishing backends to compare, all available by default
+    only : str, run the benchmarks whose name contains this (case insensitive)
+    """
+    repeat = kwargs.get("repeat", 5)
+    backends = kwargs.get("backends", None) or fishing.available_backends()
+    only = kwargs.get("only", None)
+    default_backend = fishing.get_backend()
+    results = []
+    for (name, parameters, setup) in benchmarks():
+        if (only is not None) and (only.lower() not in name.lower()):
+            continue
+        for backend in (backends if name.startswith("Fishing") else [default_backend]):
+            entry = {"name": name, "parameters": parameters, "backend": backend, "repeat": repeat}
+            try:
+                fishing.set_backend(backend)
+                entry.update(time_benchmark(setup, repeat))
+            except (ImportError, ValueError) as error:
+                entry["skipped"] = str(error)
+            results.append(entry)
+    fishing.set_backend(default_backend)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "available_backends": fishing.available_backends(),
+            "seed": SEED,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m idlescape.bench", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--backend", nargs="*", default=None, help="fishing backends, all available by default")
+    parser.add_argument("--only", default=None, help="only run benchmarks whose name contains this")
+    parser.add_argument("--output", default=None, help="write the json here instead of stdout")
+    args = parser.parse_args(argv)
+    # Keep stdout clean for the json, the models print diagnostics
+    with contextlib.redirect_stdout(sys.stderr):
+        results = run(repeat=args.repeat, backends=args.backend, only=args.only)
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
-import json
-import importlib.resources as ires
+from . import datastore
+from . import profiling
+from .itemtable import ItemTable
 
 
 class Character:
@@ -8,7 +9,7 @@ class Character:
     """
 
     def __init__(self, **kwargs):
-        self.item_data = select_items(kwargs.get("datafile", str(ires.path('idlescape', 'data'))+"/items.json"))
+        self.item_data = select_items(kwargs.get("datafile", datastore.data_file("items.json")))
         self.item_lookup_table = {v['name']:k for (k, v) in self.item_data.items()}
         self.equipment_set = kwargs.get("equipment_set", None)
         # Fishing
@@ -22,6 +23,7 @@ class Character:
         self.reel_power = kwargs.get("reel_power", 0)
         self.bait_reel_power = kwargs.get("bait_reel_power", 0)
         self.bait_bonus_rarity = kwargs.get("bait_bonus_rarity", 0)
+        self.bonus_rarity = kwargs.get("bonus_rarity", 0)
         # Mining
         self.mining_level = kwargs.get("mining_level", 1)
         self.mining_bonus = kwargs.get("mining_bonus", 0)
@@ -39,6 +41,26 @@ class Character:
         # Enchantments
         self.enchantments = kwargs.get("enchantments", dict())
 
+    def __setattr__(self, name, value):
+        if name == 'enchantments':
+            # Always a copy owned by this character, so changes bump this character's revision
+            value = Enchantments(value, owner=self)
+        super().__setattr__(name, value)
+        self.touch()
+
+    def __copy__(self):
+        # The copy owns its own enchantments, so changing them bumps the copy's revision only
+        clone = self.__class__.__new__(self.__class__)
+        clone.__dict__.update(self.__dict__)
+        clone.__dict__['enchantments'] = Enchantments(self.enchantments, owner=clone)
+        return clone
+
+    def touch(self):
+        """
+        Bump the revision so derived stats held by actions are recomputed
+        """
+        self.__dict__['revision'] = self.__dict__.get('revision', 0) + 1
+
     def assign_equipment(self, eq_set):
         self.equipment_set = eq_set
         self._update_stats()
@@ -56,6 +78,7 @@ class Character:
         self.foraging_set_bonus = 0
         self.smithing_bonus = 0
 
+    @profiling.instrument
     def _update_stats(self):
         """
         Tally Stats from equipment set
@@ -127,6 +150,10 @@ class Character:
         if fishing_set_count == 4:
             self.fishing_set_bonus = 0.4
 
+    @property
+    def item_table(self):
+        return ItemTable.for_items(self.item_data)
+
     def get_item_by_name(self, name):
         index = self.item_lookup_table.get(name, None)
         if index is None:
@@ -134,6 +161,83 @@ class Character:
         return self.item_data[index]
 
 
+class CharacterOverlay(Character):
+    """
+    Copy-on-write view of a Character. Attributes set on the overlay are stored on it, everything else
+    (item data, lookup table, untouched stats) is read from the base character, which is never modified.
+    The enchantments are copied when the overlay is made.
+    Example: CharacterOverlay(player, mining_level=60, enchantments={'haste': 2})
+    """
+
+    def __init__(self, base, **kwargs):
+        self.__dict__['base'] = base
+        self.__dict__['changes'] = 0
+        self.enchantments = kwargs.pop('enchantments', base.enchantments)
+        for (name, value) in kwargs.items():
+            setattr(self, name, value)
+
+    def __getattr__(self, name):
+        # Only reached for attributes the overlay does not hold
+        base = self.__dict__.get('base', None)
+        if base is None:
+            raise AttributeError(name)
+        return getattr(base, name)
+
+    def touch(self):
+        # Also reached while copy.deepcopy restores the enchantments, before changes is set
+        self.__dict__['changes'] = self.__dict__.get('changes', 0) + 1
+
+    @property
+    def revision(self):
+        return self.base.revision, self.changes
+
+
+class Enchantments(dict):
+    """
+    Enchantment levels keyed by name, any change bumps the owning character revision
+    """
+
+    def __init__(self, *args, owner=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.owner = owner
+
+    def _touch(self):
+        owner = self.__dict__.get('owner', None)
+        if owner is not None:
+            owner.touch()
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._touch()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._touch()
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._touch()
+
+    def setdefault(self, key, default=None):
+        value = super().setdefault(key, default)
+        self._touch()
+        return value
+
+    def pop(self, *args):
+        value = super().pop(*args)
+        self._touch()
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        self._touch()
+        return item
+
+    def clear(self):
+        super().clear()
+        self._touch()
+
+
 class EquipmentSet:
     """
     Character equipment set. A single character can have multiples (for different zones
@@ -191,8 +295,10 @@ class EquipmentComponent:
         self.augment = int(split_string[1])
 
 def select_items(data_file):
-    with open(data_file) as jj:
-        data = json.load(jj)
-        for (k, v) in data.items():
-            data[k]['name'] = data[k]['name'].replace("'", "")
-        return data
+    return datastore.load_json(data_file, transform=_clean_item_names)
+
+
+def _clean_item_names(data):
+    for (k, v) in data.items():
+        data[k]['name'] = data[k]['name'].replace("'", "")
+    return data
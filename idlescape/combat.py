@@ -15,10 +15,10 @@ class Combat:
         agility = target.agility
         defense_level_rating = defense_level * 5
         hard_to_hit = target.enchantments.get("Hard to Hit", 0)
-        hard_to_hit_bonus = max(20, agility * (1 + hard_to_hit))
+        hard_to_hit_bonus = np.maximum(20, agility * (1 + hard_to_hit))
         ice_armor = target.enchantments.get("Ice Armor", 0)
         rooted = target.enchantments.get("Rooted", 0)
-        rooted_bonus = max(20, agility * (1 + rooted))
+        rooted_bonus = np.maximum(20, agility * (1 + rooted))
         final_agility = agility + hard_to_hit_bonus - ice_armor - rooted_bonus
         agility_rating_mult = (1.5 * final_agility + 60) / 120
         return defense_level_rating * agility_rating_mult
@@ -31,7 +31,7 @@ class Combat:
         attack_level = target.attack
         mastery_level = target.attack_mastery
         scaled_affinity_accuracy_sum = 0
-        ability = ability if ability is not None else Ability()
+        ability = ability if ability is not None else _default_ability
         for (affinity_index, scaling) in ability.accuracy_scaling.items():
             scaled_affinity_accuracy_sum += self.get_affinity_value(
                 accuracy_affinity_ratings, scaling
@@ -43,17 +43,107 @@ class Combat:
         nimble = 0
         target_bonus_mult_final = 1 + nimble
         source_bonus_mult = 1
-        target_accuracy_rating = max(1.1, self.get_defensive_accuracy_rating(defender) * target_bonus_mult_final)
-        source_accuracy_rating = max(1.1, self.get_offensive_accuracy_rating(attacker, ability) * source_bonus_mult)
+        target_accuracy_rating = np.maximum(1.1, self.get_defensive_accuracy_rating(defender)
+                                            * target_bonus_mult_final)
+        source_accuracy_rating = np.maximum(1.1, self.get_offensive_accuracy_rating(attacker, ability)
+                                            * source_bonus_mult)
         clash = source_accuracy_rating / target_accuracy_rating
         clash_log = np.log10(source_accuracy_rating) / np.log10(target_accuracy_rating)
         return (clash + clash_log) / 2
 
     def damage_to_target(self, attacker, defender, ability=None):
         hit_chance = self.chance_to_hit(attacker, defender, ability)
-        protection = 300 / (300 + defender.protection + defender.defense_mastery)
+        protection = self.protection_multiplier(defender)
         resistance = 120 / (80 + defender.resistance + defender.constitution_mastery)
-        return min(hit_chance, 1.0) * protection
+        return np.minimum(hit_chance, 1.0) * protection
+
+    def protection_multiplier(self, defender):
+        return 300 / (300 + defender.protection + defender.defense_mastery)
+
+    def simulate_encounters(self, attackers, defenders, **kwargs):
+        """
+        Monte Carlo fights to the death between attackers and defenders (Combatants, lists or CombatantBatches,
+        paired element by element, a single one broadcasts against the others).
+
+        Both sides attack every speed seconds (the attacker first on ties), starting from full hitpoints.
+        A swing lands with min(chance_to_hit, 1) and deals a uniform roll between 1 and max_hit scaled by the
+        target's protection multiplier, as in damage_to_target.
+
+        Parameters
+        ----------
+        fights : int, fights per pair (10000)
+        seed : int, optional
+        max_time : float, fights still going after this many seconds end undecided (3600)
+        respawn : float, seconds between kills for the kill rates (0)
+        attacker_max_hit, defender_max_hit : arrays, largest roll, strength + power by default
+
+        Returns
+        -------
+        dict
+            time_to_kill (pairs, fights) seconds, nan unless the defender died
+            died (pairs, fights) True where the attacker died
+            death_probability (pairs,)
+            kills_per_hour (pairs, fights) 3600 / (time_to_kill + respawn) for every fight, 0 unless it was won
+            mean_kills_per_hour (pairs,) kills over the total time fought (plus respawns)
+        """
+        fights = kwargs.get("fights", 10000)
+        seed = kwargs.get("seed", None)
+        max_time = kwargs.get("max_time", 3600.0)
+        respawn = kwargs.get("respawn", 0.0)
+        attackers = CombatantBatch.from_combatants(attackers)
+        defenders = CombatantBatch.from_combatants(defenders)
+        attacker_max_hit = kwargs.get("attacker_max_hit", attackers.strength + attackers.power)
+        defender_max_hit = kwargs.get("defender_max_hit", defenders.strength + defenders.power)
+        parameters = np.broadcast_arrays(
+            np.minimum(self.chance_to_hit(attackers, defenders), 1.0), self.protection_multiplier(defenders),
+            np.maximum(attacker_max_hit, 1), attackers.speed, attackers.hitpoints,
+            np.minimum(self.chance_to_hit(defenders, attackers), 1.0), self.protection_multiplier(attackers),
+            np.maximum(defender_max_hit, 1), defenders.speed, defenders.hitpoints)
+        parameters = [np.ascontiguousarray(value, dtype=np.float64) for value in parameters]
+        if np.any(parameters[3] <= 0) or np.any(parameters[8] <= 0):
+            raise ValueError("Combatant speed must be positive")
+        pairs = len(parameters[0])
+        seeds = np.random.SeedSequence(seed).generate_state(max(1, -(-pairs * fights // _ENCOUNTER_CHUNK)))
+        times, outcomes = _simulate_encounters_jit(*parameters, int(fights), float(max_time), seeds.astype(np.int64))
+        times = times.reshape(pairs, fights)
+        outcomes = outcomes.reshape(pairs, fights)
+        won = outcomes > 0
+        kills = np.sum(won, axis=1)
+        return {
+            "time_to_kill": np.where(won, times, np.nan),
+            "died": outcomes < 0,
+            "death_probability": np.mean(outcomes < 0, axis=1),
+            "kills_per_hour": np.where(won, 3600 / (times + respawn), 0.0),
+            "mean_kills_per_hour": 3600 * kills / (np.sum(times, axis=1) + kills * respawn),
+        }
+
+    # Matchup matrices, attackers along the rows and defenders along the columns
+    def chance_to_hit_matrix(self, attackers, defenders, ability=None):
+        """
+        chance_to_hit of every attacker against every defender (Combatants, lists of them or CombatantBatches),
+        shape (attackers, defenders)
+        """
+        attackers = CombatantBatch.from_combatants(attackers)
+        defenders = CombatantBatch.from_combatants(defenders)
+        nimble = 0
+        target_bonus_mult_final = 1 + nimble
+        source_bonus_mult = 1
+        target_accuracy_rating = np.maximum(1.1, self.get_defensive_accuracy_rating(defenders)
+                                            * target_bonus_mult_final)
+        source_accuracy_rating = np.maximum(1.1, self.get_offensive_accuracy_rating(attackers, ability)
+                                            * source_bonus_mult)
+        # Logarithms per combatant, only the ratios are taken over the matrix
+        clash = source_accuracy_rating[:, None] / target_accuracy_rating[None, :]
+        clash_log = np.log10(source_accuracy_rating)[:, None] / np.log10(target_accuracy_rating)[None, :]
+        return (clash + clash_log) / 2
+
+    def damage_matrix(self, attackers, defenders, ability=None):
+        """
+        damage_to_target of every attacker against every defender, shape (attackers, defenders)
+        """
+        hit_chance = self.chance_to_hit_matrix(attackers, defenders, ability)
+        protection = self.protection_multiplier(CombatantBatch.from_combatants(defenders))
+        return np.minimum(hit_chance, 1.0) * protection[None, :]
 
 
 class Combatant:
@@ -123,7 +213,157 @@ class Combatant:
         return true_final
 
 
+class CombatantBatch(Combatant):
+    """
+    Many combatants as arrays (struct of arrays). Takes the Combatant keyword arguments with arrays, broadcast
+    against each other, in place of numbers, and enchantments as {name: levels}.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._to_arrays()
+
+    def _to_arrays(self):
+        names = [name for name in vars(self) if name != 'enchantments']
+        enchantments = list(self.enchantments.keys())
+        values = np.broadcast_arrays(*[np.atleast_1d(np.asarray(getattr(self, name), dtype=float)) for name in names],
+                                     *[np.atleast_1d(np.asarray(self.enchantments[name], dtype=float))
+                                       for name in enchantments])
+        for (name, value) in zip(names, values):
+            setattr(self, name, value)
+        self.enchantments = dict(zip(enchantments, values[len(names):]))
+
+    @classmethod
+    def from_combatants(cls, combatants):
+        """
+        Stack a Combatant or a list of them, batches are returned as they are
+        """
+        if isinstance(combatants, CombatantBatch):
+            return combatants
+        if isinstance(combatants, Combatant):
+            combatants = [combatants]
+        batch = cls.__new__(cls)
+        for name in vars(Combatant()):
+            if name != 'enchantments':
+                setattr(batch, name, np.array([getattr(combatant, name) for combatant in combatants], dtype=float))
+        enchantments = sorted(set().union(*[combatant.enchantments.keys() for combatant in combatants]))
+        batch.enchantments = {name: np.array([combatant.enchantments.get(name, 0) for combatant in combatants],
+                                             dtype=float) for name in enchantments}
+        batch._to_arrays()
+        return batch
+
+    def __len__(self):
+        return len(self.attack)
+
+
 class Ability:
     def __init__(self, **kwargs):
         self.accuracy_scaling = kwargs.get('accuracy_scaling', dict())
         self.base_accuracy_coeff = kwargs.get('base_accuracy', 1.0)
+
+
+_default_ability = Ability()
+# Fights per random stream, the results do not depend on how they are scheduled over threads
+_ENCOUNTER_CHUNK = 4096
+
+
+def _simulate_encounters_numpy(hit_a, damage_a, max_hit_a, speed_a, hitpoints_a, hit_d, damage_d, max_hit_d,
+                               speed_d, hitpoints_d, fights, max_time, seeds):
+    """
+    All fights advance together, one swing each per pass.
+    Returns (fight duration, outcome: 1 defender killed, -1 attacker died, 0 undecided) per pair and fight
+    """
+    rng = np.random.default_rng(seeds)
+    pair = np.repeat(np.arange(len(hit_a)), fights)
+    times = np.full(len(pair), max_time)
+    outcomes = np.zeros(len(pair), dtype=np.int8)
+    health_a = hitpoints_a[pair]
+    health_d = hitpoints_d[pair]
+    next_a = speed_a[pair]
+    next_d = speed_d[pair]
+    active = np.arange(len(pair))
+    while active.size > 0:
+        p = pair[active]
+        attacking = next_a[active] <= next_d[active]
+        now = np.where(attacking, next_a[active], next_d[active])
+        timeout = now > max_time
+        hit = rng.random(active.size) < np.where(attacking, hit_a[p], hit_d[p])
+        roll = np.floor(rng.random(active.size) * np.where(attacking, max_hit_a[p], max_hit_d[p])) + 1
+        damage = np.where(hit & ~timeout, roll, 0.0)
+        health_d[active] -= np.where(attacking, damage * damage_a[p], 0.0)
+        health_a[active] -= np.where(attacking, 0.0, damage * damage_d[p])
+        next_a[active] += np.where(attacking, speed_a[p], 0.0)
+        next_d[active] += np.where(attacking, 0.0, speed_d[p])
+        killed = health_d[active] <= 0
+        died = health_a[active] <= 0
+        outcomes[active[killed]] = 1
+        outcomes[active[died]] = -1
+        finished = killed | died
+        times[active[finished]] = now[finished]
+        active = active[~(finished | timeout)]
+    return times, outcomes
+
+
+try:
+    from numba import jit, prange
+
+    # Compiled on the first call (or in warmup()), cache=True keeps the machine code on disk
+    @jit(nopython=True, cache=True)
+    def _fight_jit(hit_a, damage_a, max_hit_a, speed_a, hitpoints_a, hit_d, damage_d, max_hit_d, speed_d,
+                   hitpoints_d, max_time):
+        health_a = hitpoints_a
+        health_d = hitpoints_d
+        next_a = speed_a
+        next_d = speed_d
+        while True:
+            if next_a <= next_d:
+                if next_a > max_time:
+                    return max_time, 0
+                if np.random.rand() < hit_a:
+                    health_d -= (np.floor(np.random.rand() * max_hit_a) + 1) * damage_a
+                    if health_d <= 0:
+                        return next_a, 1
+                next_a += speed_a
+            else:
+                if next_d > max_time:
+                    return max_time, 0
+                if np.random.rand() < hit_d:
+                    health_a -= (np.floor(np.random.rand() * max_hit_d) + 1) * damage_d
+                    if health_a <= 0:
+                        return next_d, -1
+                next_d += speed_d
+
+
+    @jit(nopython=True, parallel=True, cache=True)
+    def _simulate_encounters_jit(hit_a, damage_a, max_hit_a, speed_a, hitpoints_a, hit_d, damage_d, max_hit_d,
+                                 speed_d, hitpoints_d, fights, max_time, seeds):
+        # Every chunk reseeds the generator of the thread running it
+        total = len(hit_a) * fights
+        times = np.empty(total)
+        outcomes = np.empty(total, dtype=np.int8)
+        for c in prange(len(seeds)):
+            np.random.seed(seeds[c])
+            for i in range(c * _ENCOUNTER_CHUNK, min(total, (c + 1) * _ENCOUNTER_CHUNK)):
+                p = i // fights
+                time, outcome = _fight_jit(hit_a[p], damage_a[p], max_hit_a[p], speed_a[p], hitpoints_a[p], hit_d[p],
+                                           damage_d[p], max_hit_d[p], speed_d[p], hitpoints_d[p], max_time)
+                times[i] = time
+                outcomes[i] = outcome
+        return times, outcomes
+
+
+    numba_available = True
+
+except ImportError:
+    _simulate_encounters_jit = _simulate_encounters_numpy
+    numba_available = False
+
+
+def warmup():
+    """
+    Run the numba encounter kernel once on a tiny input, see idlescape.warmup
+    """
+    if not numba_available:
+        return
+    ones = np.ones(1)
+    _simulate_encounters_jit(ones, ones, ones, ones, ones, ones, ones, ones, ones, ones, 1, 1.0, np.zeros(1, np.int64))
@@ -1,3 +1,4 @@
 from .interactive_character import InteractiveCharacter
 from .action_summary import ActionSummary
 from .balance_editor import BalanceEditor
+from .profiling_panel import ProfilingPanel
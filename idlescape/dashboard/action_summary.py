@@ -3,6 +3,7 @@ import numpy as np
 import pandas as pd
 import hvplot.pandas
 from idlescape.dashboard import InteractiveCharacter
+from idlescape import profiling
 
 
 class ActionSummary:
@@ -45,6 +46,7 @@ class ActionSummary:
                 self.craft_xp[v["name"]] = crafting_xp
                 self.alt_heat[v["name"]] = v.get("size", 0) / 20 * 240
 
+    @profiling.instrument
     def summarize(self, action, zone):
         """
 
@@ -66,17 +68,19 @@ class ActionSummary:
         height_per_row = 25
         options = {'rot': 45, 'min_height': 400, 'max_height': 800, 'responsive': False}
         skip_items = ['Heat']
-        the_plot = (item_series[item_series.gt(0)]).drop(labels=skip_items, errors='ignore').hvplot.bar(**options)
-        tab_options = {'sortable': True, 'height': (len(item_series) + 1) * height_per_row}
-        the_table = item_series.hvplot.table(columns=['index', 'Count / Hour'], **tab_options)
+        with profiling.timer("ActionSummary.hvplot"):
+            the_plot = (item_series[item_series.gt(0)]).drop(labels=skip_items, errors='ignore').hvplot.bar(**options)
+            tab_options = {'sortable': True, 'height': (len(item_series) + 1) * height_per_row}
+            the_table = item_series.hvplot.table(columns=['index', 'Count / Hour'], **tab_options)
 
         total_craft_xp = np.sum([item_series.get(k, 0) * v for (k, v) in self.craft_xp.items()])
-        total_cooking_xp = 0
-        total_combustible = 0
-        for (k, v) in item_series.items():
-            this_item = self.character.player.get_item_by_name(k)
-            total_cooking_xp += 5 * (this_item.get('difficulty', 0) + this_item.get('bonusDifficultyXP', 0)) * v
-            total_combustible += (this_item.get('heat', 0) + self.alt_heat.get(k, 0)) * v
+        item_table = self.character.player.item_table
+        rows = item_table.rows_by_name(item_series.index)
+        counts = item_series.to_numpy()
+        cooking_difficulty = item_table.column('difficulty', rows) + item_table.column('bonus_difficulty_xp', rows)
+        total_cooking_xp = np.dot(5 * cooking_difficulty, counts)
+        alt_heat = np.array([self.alt_heat.get(k, 0) for k in item_series.index])
+        total_combustible = np.dot(item_table.column('heat', rows) + alt_heat, counts)
         total_zone_experience = action.zone_experience_rate(zone)
         second_df = pd.Series({'Experience': total_zone_experience,
                                'Crafting': total_craft_xp,
@@ -84,6 +88,7 @@ class ActionSummary:
                                'Combustible': total_combustible})
         second_df = second_df[second_df.gt(0)].round(0)
         second_df.name = 'Count / Hour'
-        second_table = second_df.hvplot.table(columns=['index', 'Count / Hour'],
-                                              height=(len(second_df) + 1) * height_per_row)
+        with profiling.timer("ActionSummary.hvplot"):
+            second_table = second_df.hvplot.table(columns=['index', 'Count / Hour'],
+                                                  height=(len(second_df) + 1) * height_per_row)
         return pn.Column(the_plot, second_table, the_table)
@@ -2,6 +2,7 @@ import panel as pn
 import json
 from io import StringIO
 from idlescape.dashboard import InteractiveCharacter
+from .. import datastore
 
 pn.extension('ace', 'jsoneditor')
 
@@ -12,8 +13,7 @@ class BalanceEditor:
         self.json_editor = None
 
     def display_editor(self, additional_callback=None):
-        with open(self.character.location_file) as j:
-            loc_data = json.load(j)
+        loc_data = datastore.load_json(self.character.location_file)
 
         # Hack to avoid json string '
         string_data = json.loads(json.dumps(loc_data).replace("'", "^^"))
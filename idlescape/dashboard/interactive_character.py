@@ -3,7 +3,7 @@ from ..character import Character, EquipmentSet
 from ..foraging import Foraging
 from ..mining import Mining
 from ..fishing import Fishing
-import importlib.resources as ires
+from .. import datastore
 import json
 import os
 
@@ -13,8 +13,8 @@ class InteractiveCharacter:
     LOCAL_CACHE_FILE = "cache.json"
 
     def __init__(self, **kwargs):
-        self.item_file = kwargs.get("item_file", str(ires.path('idlescape', 'data')) + "/items.json")
-        self.location_file = kwargs.get("location_file", str(ires.path('idlescape', 'data')) + "/locations.json")
+        self.item_file = kwargs.get("item_file", datastore.data_file("items.json"))
+        self.location_file = kwargs.get("location_file", datastore.data_file("locations.json"))
         self.level_widget_list = None
         self.equipment_widget_list = None
         self.enchant_widget_list = None
@@ -0,0 +1,31 @@
+import panel as pn
+from idlescape import profiling
+
+
+class ProfilingPanel:
+    """
+    Debug tab listing the instrumentation records, see idlescape.profiling
+    """
+
+    def __init__(self):
+        self.table = pn.widgets.Tabulator(profiling.statistics_frame(), disabled=True, sizing_mode='stretch_width')
+
+    def refresh(self, event=None):
+        self.table.value = profiling.statistics_frame()
+
+    def clear(self, event=None):
+        profiling.reset()
+        self.refresh()
+
+    def view(self):
+        """
+        Returns
+        -------
+        panel.Column
+            Refresh / reset buttons above the statistics table
+        """
+        refresh_button = pn.widgets.Button(name='Refresh', button_type='default')
+        reset_button = pn.widgets.Button(name='Reset', button_type='default')
+        refresh_button.on_click(self.refresh)
+        reset_button.on_click(self.clear)
+        return pn.Column(pn.Row(refresh_button, reset_button), self.table)
@@ -0,0 +1,94 @@
+import json
+import os
+from . import profiling
+
+_loaded = dict()
+
+
+def data_file(name):
+    """
+    Path to one of the json files bundled in idlescape/data
+    """
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', name)
+
+
+@profiling.instrument("datastore.load_json")
+def load_json(path, **kwargs):
+    """
+    Parse a json data file once per process and share the result between every caller.
+
+    The data is kept by the path, modification time and size of the source file, so an edited file is parsed
+    again. It is frozen (read-only dicts, lists as tuples) since every caller shares it, see thaw for a mutable
+    copy. Other processes can be handed the parsed data with loaded and preload.
+
+    Parameters
+    ----------
+    path : str
+    transform : callable, optional
+        Applied to the parsed json before it is shared, must be a module level function
+    """
+    transform = kwargs.get("transform", None)
+    transform_name = "" if transform is None else f"{transform.__module__}.{transform.__qualname__}"
+    status = os.stat(path)
+    process_key = (os.path.abspath(path), status.st_mtime_ns, status.st_size, transform_name)
+    profiling.cache("datastore.load_json", process_key in _loaded)
+    if process_key in _loaded:
+        return _loaded[process_key]
+    with open(path, 'rb') as source:
+        data = json.load(source)
+    if transform is not None:
+        data = transform(data)
+    data = _freeze(data)
+    _loaded[process_key] = data
+    return data
+
+
+def thaw(data):
+    """
+    Mutable (plain dict and list) copy of frozen data
+    """
+    return json.loads(json.dumps(data))
+
+
+def loaded():
+    """
+    Every file parsed in this process, keyed the way load_json keys them, for handing to workers with preload
+    """
+    return dict(_loaded)
+
+
+def preload(data):
+    """
+    Share files parsed by another process (see loaded), load_json returns them without parsing again
+    """
+    _loaded.update(data)
+
+
+def clear():
+    """
+    Forget every file loaded in this process
+    """
+    _loaded.clear()
+
+
+class FrozenDict(dict):
+    """
+    Read-only dict, loaded data is shared between every caller
+    """
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Loaded data is shared and read-only, use datastore.thaw for a mutable copy")
+
+    __setitem__ = __delitem__ = update = setdefault = pop = popitem = clear = _read_only
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return FrozenDict((k, _freeze(v)) for (k, v) in value.items())
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
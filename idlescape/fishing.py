@@ -1,8 +1,15 @@
 from abc import ABC
 
+from dataclasses import dataclass
 from .gathering import *
 from .character import *
+from . import profiling
+import multiprocessing
+import time
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from copy import copy
+from functools import lru_cache
 
 
 class Fishing(Gathering, ABC):
@@ -17,6 +24,14 @@ class Fishing(Gathering, ABC):
         self.items = self.player.item_data
         self.locations = self._select_action_locations(location_data)
         self.accuracy = kwargs.get("accuracy", 10000)
+        self.monte_carlo = kwargs.get("monte_carlo", False)
+        # Monte Carlo precision: stop early once the relative standard error or time budget (seconds) is reached
+        self.seed = kwargs.get("seed", None)
+        self.relative_error = kwargs.get("relative_error", None)
+        self.time_budget = kwargs.get("time_budget", None)
+        # Split simulations over threads (numba) or a pool of worker processes (numpy)
+        self.parallel = kwargs.get("parallel", False)
+        self.workers = kwargs.get("workers", None)
         self.alt_experience = kwargs.get("alt_experience", None)
 
     def _effective_level(self):
@@ -49,40 +64,52 @@ class Fishing(Gathering, ABC):
         bait = self.player.bait_reel_power * (1 + self.get_enchant('deadliestCatch') * 0.05)
         return (gear_base + gear_enchant) * set_bonus + bait
 
+    def _compute_stats(self):
+        return FishingStats(bait_power=self._bait_power(),
+                            reel_power=self._reel_power(),
+                            bonus_rarity=self._bonus_rarity(),
+                            fishing=self.get_enchant('fishing'),
+                            fishing_magnetism=self.get_enchant('fishingMagnetism'),
+                            fiber_finder=self.get_enchant('fiberFinder'),
+                            gear_level=self.player.fishing_level + self.player.fishing_bonus,
+                            gear_bait_power=self.player.bait_power,
+                            **self._gathering_stats())
+
     def _node_rates(self, location):
         frequency_dict = dict()
+        stats = self.stats
         for (k, v) in location.nodes.items():
-            frequency = (v.frequency + self._bonus_rarity()) * (1 + self._effective_level() / 360)
+            frequency = (v.frequency + stats.bonus_rarity) * (1 + stats.effective_level / 360)
             frequency = min(frequency, v.max_frequency)
 
             frequency_dict[k] = max(0, frequency)
         # Fishing magnetism boost
         positive_average = np.mean([v for (k, v) in frequency_dict.items() if v > 0])
         boosted_frequency_dict = \
-            {k: (v * (1 + self.get_enchant('fishingMagnetism') * 2 / 50) if v < positive_average else v)
+            {k: (v * (1 + stats.fishing_magnetism * 2 / 50) if v < positive_average else v)
              for (k, v) in frequency_dict.items()}
         # Normalize
         total_frequency = sum([v for (k, v) in boosted_frequency_dict.items()])
         return {k: v / total_frequency for (k, v) in boosted_frequency_dict.items()}
 
-    def _get_relative_frequency(self, loot):
-        frequency = (loot.frequency + self._bonus_rarity()) * (1 + self._effective_level() / 360)
-        frequency = min(frequency, loot.max_frequency)
-        if loot.item_class == "fiber":
-            frequency = frequency * (1 + self.get_enchant('fiberFinder') * 0.25)
-        return max(0, frequency)
+    def _relative_frequencies(self, table):
+        stats = self.stats
+        frequency = (table.loot_frequency + stats.bonus_rarity) * (1 + stats.effective_level / 360)
+        frequency = np.minimum(frequency, table.loot_max_frequency)
+        frequency = np.where(table.is_class("fiber"), frequency * (1 + stats.fiber_finder * 0.25), frequency)
+        return np.maximum(0, frequency)
 
     def _node_base_chance(self, location):
-        fishing_enchant = self.get_enchant("fishing")
+        stats = self.stats
         # Changed bait_power from 420 to 200, 0.2 to 0.3
-        return 0.4 + (self._effective_level() - location.level * 1.25) / 275 + (fishing_enchant * 0.025) + (
-                self._bait_power() / 200)
+        return 0.4 + (stats.effective_level - location.level * 1.25) / 275 + (stats.fishing * 0.025) + (
+                stats.bait_power / 200)
 
     def _average_tries_to_find_node(self, location):
         average_tries = 0
         chance_to_reach_this_attempt = 1
         base_chance = self._node_base_chance(location)
-        fishing_enchant = self.get_enchant('fishing')
+        fishing_enchant = self.stats.fishing
 
         for nodeFindFailures in range(7):
             chance_this_attempt = min(1, base_chance + fishing_enchant * 0.025 + nodeFindFailures / 6)
@@ -91,17 +118,73 @@ class Fishing(Gathering, ABC):
         return average_tries
 
     def _average_node_size(self, location, node):
-        nodes = self.accuracy
-        return self._calculate_node_resources(node, location, trials=nodes)
+        if self.monte_carlo:
+            return self._simulate_node_size(location, node)[0]
+        sizes, probabilities = self._node_size_distribution(location, node)
+        return np.dot(sizes, probabilities)
+
+    def _node_size_distribution(self, location, node):
+        """
+        Exact probability mass function of the node size, returned as (sizes, probabilities)
+        """
+        stats = self.stats
+        return _node_size_pmf_fishing(location.level, node.minimum_base_amount, node.maximum_base_amount,
+                                      stats.effective_level, stats.bait_power)
 
     def _calculate_node_resources(self, node, location, **kwargs):
         zone_level = location.level
         min_base = node.minimum_base_amount
         max_base = node.maximum_base_amount
         trials = kwargs.get('trials', 1)
-        return _calculate_node_resources_jit_fishing(zone_level, min_base, max_base, self._effective_level(),
-                                                     self._bait_power(),
-                                                     trials)
+        stats = self.stats
+        return _calculate_node_resources_jit_fishing(zone_level, min_base, max_base, stats.effective_level,
+                                                     stats.bait_power,
+                                                     trials, kwargs.get('seed', self.seed))
+
+    def _monte_carlo_options(self, **kwargs):
+        return {
+            "seed": kwargs.get("seed", self.seed),
+            "relative_error": kwargs.get("relative_error", self.relative_error),
+            "time_budget": kwargs.get("time_budget", self.time_budget),
+            "max_trials": kwargs.get("accuracy", self.accuracy),
+        }
+
+    def _simulate_node_size(self, location, node, **kwargs):
+        stats = self.stats
+
+        def draw(trials, seed):
+            return _sample_node_resources_fishing(location.level, node.minimum_base_amount,
+                                                  node.maximum_base_amount, stats.effective_level,
+                                                  stats.bait_power, trials, seed, parallel=self.parallel,
+                                                  workers=self.workers)
+
+        return _adaptive_estimate(draw, **self._monte_carlo_options(**kwargs))
+
+    def _simulate_tries_to_finish_node(self, location, node, **kwargs):
+        stats = self.stats
+        table = _tries_to_finish_table(self._node_base_chance(location), stats.fishing)
+
+        def draw(trials, seed):
+            node_resources = _sample_node_resources_fishing(location.level, node.minimum_base_amount,
+                                                            node.maximum_base_amount, stats.gear_level,
+                                                            stats.gear_bait_power, trials, seed,
+                                                            parallel=self.parallel, workers=self.workers)
+            return _tries_to_finish_node_fishing(table, node_resources, parallel=self.parallel)
+
+        return _adaptive_estimate(draw, **self._monte_carlo_options(**kwargs))
+
+    def simulate_node(self, location_name, node_id, **kwargs):
+        """
+        Monte Carlo estimate of the average node size and reel attempts of a node, with uncertainties.
+        Keyword arguments override the instance seed, relative_error, time_budget and accuracy (maximum trials).
+        Returns {'size': (mean, standard_error, trials), 'tries': (mean, standard_error, trials)}
+        """
+        location = self.get_location_by_name(location_name)
+        node = location.nodes[node_id]
+        return {
+            "size": self._simulate_node_size(location, node, **kwargs),
+            "tries": self._simulate_tries_to_finish_node(location, node, **kwargs),
+        }
 
     def _node_sizes(self, location):
         return {k: self._average_node_size(location, v) for (k, v) in location.nodes.items()}
@@ -113,119 +196,653 @@ class Fishing(Gathering, ABC):
         zone_level = location.level
         min_base = node.minimum_base_amount
         max_base = node.maximum_base_amount
-        fishing_level = self.player.fishing_level + self.player.fishing_bonus
-        bait_power = self.player.bait_power
+        stats = self.stats
+        fishing_level = stats.gear_level
+        bait_power = stats.gear_bait_power
         base_chance = self._node_base_chance(location)
-        fishing_enchant = self.get_enchant('fishing')
-        return _average_tries_to_finish_node_jit_fishing(base_chance, zone_level, min_base, max_base, fishing_level,
-                                                         bait_power, fishing_enchant, self.accuracy)
+        fishing_enchant = stats.fishing
+        if self.monte_carlo:
+            return self._simulate_tries_to_finish_node(location, node)[0]
+        sizes, probabilities = _node_size_pmf_fishing(zone_level, min_base, max_base, fishing_level, bait_power)
+        return _expected_tries_to_finish_node_fishing(base_chance, fishing_enchant, sizes, probabilities)
 
+    @profiling.instrument
     def zone_action_rate(self, location_name):
         """
         Action rate (per hour)
         """
         location = self.get_location_by_name(location_name)
-        if location.level > self.player.fishing_level:
+        stats = self.stats
+        if location.level > stats.level:
             return 0
 
-        node_rates = self._node_rates(location)
-        node_sizes = self._node_sizes(location)
-        node_actions = self._node_actions(location)
-        haste = self.get_enchant('haste')
+        node_rates, node_sizes, node_actions = self._node_statistics(location)
 
-        base_time = location.base_duration / 1000 / (1 + haste * 0.04)
-        node_search_time = max(1, base_time * 1.75 * (1 - (self._bait_power() / 400)))
+        base_time = location.base_duration / 1000 / (1 + stats.haste * 0.04)
+        node_search_time = max(1, base_time * 1.75 * (1 - (stats.bait_power / 400)))
         a_find = self._average_tries_to_find_node(location)
-        loot_search_time = max(1, base_time / 1.25 * (200 / (self._reel_power() + 200)))
+        loot_search_time = max(1, base_time / 1.25 * (200 / (stats.reel_power + 200)))
 
-        total_actions = 0
-        total_time = 0
-        for (name, rate) in node_rates.items():
-            total_time += (node_search_time * a_find + loot_search_time * node_actions[name]) * rate
-            total_actions += node_sizes[name] * rate
+        total_time = np.dot(node_search_time * a_find + loot_search_time * node_actions, node_rates)
+        total_actions = np.dot(node_sizes, node_rates)
         return total_actions / total_time * 3600
 
+    @profiling.instrument
+    def zone_action_rate_grid(self, location_name, **kwargs):
+        """
+        Action rate (per hour) over a grid of character attributes in a single pass.
+        Keyword arguments name Character attributes (fishing_level, fishing_bonus, bait_power, reel_power,
+        bonus_rarity, ...) and are broadcast against each other, anything not given is read from the character.
+        Example: zone_action_rate_grid('Still Lake', fishing_level=np.arange(1, 201)[:, None],
+                                       bait_power=np.arange(0, 250, 5)[None, :])
+        Node sizes always use the exact distribution.
+        """
+        location = self.get_location_by_name(location_name)
+        names = list(kwargs.keys())
+        values = np.broadcast_arrays(*[np.asarray(kwargs[name], dtype=float) for name in names])
+        shape = values[0].shape if values else ()
+        grid_action = copy(self)
+        overrides = {name: value.ravel() for (name, value) in zip(names, values)}
+        grid_action.player = CharacterOverlay(self.player, **overrides)
+        stats = grid_action._compute_stats()
+        points = int(np.prod(shape))
+        level = np.broadcast_to(stats.level, points)
+        effective_level = np.broadcast_to(stats.effective_level, points)
+        bait_power = np.broadcast_to(stats.bait_power, points)
+        reel_power = np.broadcast_to(stats.reel_power, points)
+        bonus_rarity = np.broadcast_to(stats.bonus_rarity, points)
+        gear_level = np.broadcast_to(stats.gear_level, points)
+        gear_bait_power = np.broadcast_to(stats.gear_bait_power, points)
+
+        # Node rates, nodes along the last axis
+        nodes = list(location.nodes.values())
+        node_frequency = np.array([node.frequency for node in nodes])
+        node_max_frequency = np.array([node.max_frequency for node in nodes])
+        frequency = (node_frequency + bonus_rarity[:, None]) * (1 + effective_level[:, None] / 360)
+        frequency = np.maximum(0, np.minimum(frequency, node_max_frequency))
+        positive = frequency > 0
+        positive_average = np.sum(frequency * positive, axis=1) / np.maximum(1, np.sum(positive, axis=1))
+        frequency = np.where(frequency < positive_average[:, None],
+                             frequency * (1 + stats.fishing_magnetism * 2 / 50), frequency)
+        node_rates = frequency / np.sum(frequency, axis=1)[:, None]
+
+        # Node sizes and reel attempts only depend on a few of the attributes
+        base_chance = (0.4 + (effective_level - location.level * 1.25) / 275 + (stats.fishing * 0.025)
+                       + (bait_power / 200))
+        size_keys, size_index = np.unique(np.stack([effective_level, bait_power], axis=1), axis=0,
+                                          return_inverse=True)
+        tries_keys, tries_index = np.unique(np.stack([gear_level, gear_bait_power, base_chance], axis=1), axis=0,
+                                            return_inverse=True)
+        size_index = size_index.ravel()
+        tries_index = tries_index.ravel()
+        # Contiguous columns, so the kernel runs the specialization compiled in warmup()
+        (size_level, size_bait_power) = np.ascontiguousarray(size_keys.T)
+        (tries_level, tries_bait_power, tries_chance) = np.ascontiguousarray(tries_keys.T)
+        node_sizes = np.empty((points, len(nodes)))
+        node_actions = np.empty((points, len(nodes)))
+        expected_node_grid = (_expected_node_grid_jit_fishing if get_backend() == "numba"
+                              else _expected_node_grid_numpy_fishing)
+        for (i, node) in enumerate(nodes):
+            bases = (float(location.level), float(node.minimum_base_amount), float(node.maximum_base_amount))
+            node_sizes[:, i] = expected_node_grid(
+                *bases, size_level, size_bait_power, size_level, False)[size_index]
+            node_actions[:, i] = expected_node_grid(
+                *bases, tries_level, tries_bait_power, tries_chance + stats.fishing * 0.025, True)[tries_index]
+
+        # Average tries to find a node
+        a_find = np.zeros(points)
+        chance_to_reach_this_attempt = np.ones(points)
+        for nodeFindFailures in range(7):
+            chance_this_attempt = np.minimum(1, base_chance + stats.fishing * 0.025 + nodeFindFailures / 6)
+            a_find += chance_this_attempt * chance_to_reach_this_attempt * (nodeFindFailures + 1)
+            chance_to_reach_this_attempt = chance_to_reach_this_attempt * (1 - chance_this_attempt)
+
+        base_time = location.base_duration / 1000 / (1 + stats.haste * 0.04)
+        node_search_time = np.maximum(1, base_time * 1.75 * (1 - (bait_power / 400)))
+        loot_search_time = np.maximum(1, base_time / 1.25 * (200 / (reel_power + 200)))
+        total_time = np.sum((node_search_time[:, None] * a_find[:, None]
+                             + loot_search_time[:, None] * node_actions) * node_rates, axis=1)
+        total_actions = np.sum(node_sizes * node_rates, axis=1)
+        rate = np.where(location.level > level, 0, total_actions / total_time * 3600)
+        return rate.reshape(shape)
+
 
 Gathering.register(Fishing)
 
+
+@dataclass(frozen=True)
+class FishingStats(GatheringStats):
+    bait_power: float = 0
+    reel_power: float = 0
+    bonus_rarity: float = 0
+    fishing: float = 0
+    fishing_magnetism: float = 0
+    fiber_finder: float = 0
+    # Finishing a node uses the gear totals without set or bait bonuses
+    gear_level: float = 0
+    gear_bait_power: float = 0
+
 # Numba JITFishing section
+def _sample_node_resources_numpy_fishing(zone_level, min_base, max_base, fishing_level, bait_power, trials, seed):
+    rng = np.random.default_rng(seed)
+    maximum_node_size = np.floor(max_base + (rng.random(trials) * (fishing_level - zone_level) / 8) + np.floor(
+        rng.random(trials) * bait_power / 20))
+    minimum_node_size = np.floor(min_base + (rng.random(trials) * (fishing_level - zone_level) / 6) + np.floor(
+        rng.random(trials) * bait_power / 10))
+
+    lucky_chance = 0.05 + (bait_power / 2000)
+    lucky_rolls = rng.random(trials) <= lucky_chance
+    minimum_node_size = minimum_node_size * (1 + 0.5 * lucky_rolls)
+    maximum_node_size = maximum_node_size * (1 + 2.0 * lucky_rolls)
+
+    delta = abs(maximum_node_size - minimum_node_size)
+    small = np.min([maximum_node_size, minimum_node_size], axis=0)
+    return np.floor(rng.random(trials) * (delta + 1) + small)
+
+
 try:
-    from numba import jit
+    from numba import jit, prange
+
+    # Kernels compile on their first call (or in warmup()), cache=True keeps the machine code on disk
+    # so later processes load it instead of compiling again
+    @jit(nopython=True, cache=True)
+    def _draw_node_resources_jit_fishing(zone_level, min_base, max_base, fishing_level, bait_power):
+        maximum_node_size = np.floor(max_base + (np.random.rand() * (fishing_level - zone_level) / 8) + np.floor(
+            np.random.rand() * bait_power / 20))
+        minimum_node_size = np.floor(min_base + (np.random.rand() * (fishing_level - zone_level) / 6) + np.floor(
+            np.random.rand() * bait_power / 10))
+
+        lucky_chance = 0.05 + (bait_power / 2000)
+        if np.random.rand() <= lucky_chance:
+            minimum_node_size *= 1.5
+            maximum_node_size *= 3.0
+
+        delta = abs(maximum_node_size - minimum_node_size)
+        small = min(maximum_node_size, minimum_node_size)
+        return np.floor(np.random.rand() * (delta + 1) + small)
 
 
-    @jit()
-    def _calculate_node_resources_jit_fishing(zone_level, min_base, max_base, fishing_level, bait_power, trials):
-        total_resources = 0
+    @jit(nopython=True, cache=True)
+    def _sample_node_resources_jit_fishing(zone_level, min_base, max_base, fishing_level, bait_power, trials, seed):
+        np.random.seed(seed)
+        node_resources = np.empty(trials)
         for i in range(trials):
-            maximum_node_size = np.floor(max_base + (np.random.rand() * (fishing_level - zone_level) / 8) + np.floor(
-                np.random.rand() * bait_power / 20))
-            minimum_node_size = np.floor(min_base + (np.random.rand() * (fishing_level - zone_level) / 6) + np.floor(
-                np.random.rand() * bait_power / 10))
-
-            lucky_chance = 0.05 + (bait_power / 2000)
-            if np.random.rand() <= lucky_chance:
-                minimum_node_size *= 1.5
-                maximum_node_size *= 3.0
-
-            delta = abs(maximum_node_size - minimum_node_size)
-            small = min(maximum_node_size, minimum_node_size)
-            total_resources += np.floor(np.random.rand() * (delta + 1) + small)
-        return total_resources / trials
-
-
-    @jit
-    def _average_tries_to_finish_node_jit_fishing(base_chance, zone_level, min_base, max_base, fishing_level,
-                                                  bait_power,
-                                                  fishing, trials):
-        node_resources = np.array(
-            [int(_calculate_node_resources_jit_fishing(zone_level, min_base, max_base, fishing_level, bait_power, 1))
-             for
-             _ in range(trials)])
-        min_node_count = min(node_resources)
-        max_node_count = max(node_resources)
-        node_average = []
-        for total_node_resources in range(min_node_count, max_node_count + 1):
-            total_tries_sub = 0.0
-            for n_res in range(total_node_resources, 0, -1):
-                never_tell_me_the_odds = min(1.0, base_chance + fishing * 0.025 + n_res / 48)
-                total_tries_sub += 1 / never_tell_me_the_odds
-            node_average.append(total_tries_sub)
-        node_average = np.array(node_average)
-        return np.mean(node_average[(node_resources - min_node_count)])
+            node_resources[i] = _draw_node_resources_jit_fishing(zone_level, min_base, max_base, fishing_level,
+                                                                 bait_power)
+        return node_resources
+
+
+    @jit(nopython=True, parallel=True, cache=True)
+    def _sample_node_resources_parallel_jit_fishing(zone_level, min_base, max_base, fishing_level, bait_power,
+                                                    trials, seeds):
+        # Every chunk reseeds the generator of the thread running it, so the result does not
+        # depend on how chunks are scheduled
+        chunks = len(seeds)
+        chunk_size = (trials + chunks - 1) // chunks
+        node_resources = np.empty(trials)
+        for c in prange(chunks):
+            np.random.seed(seeds[c])
+            for i in range(c * chunk_size, min(trials, (c + 1) * chunk_size)):
+                node_resources[i] = _draw_node_resources_jit_fishing(zone_level, min_base, max_base, fishing_level,
+                                                                     bait_power)
+        return node_resources
+
+
+    @jit(nopython=True, parallel=True, cache=True)
+    def _tries_to_finish_parallel_jit_fishing(table, node_resources):
+        tries = np.empty(len(node_resources))
+        last = len(table) - 1
+        for i in prange(len(node_resources)):
+            n_res = max(0.0, node_resources[i])
+            index = min(int(n_res), last)
+            tries[i] = table[index] + (n_res - index)
+        return tries
+
+
+    numba_available = True
 
 except ImportError:
-    def _calculate_node_resources_jit_fishing(zone_level, min_base, max_base, fishing_level, bait_power, trials):
-        maximum_node_size = np.floor(max_base + (np.random.rand(trials) * (fishing_level - zone_level) / 8) + np.floor(
-            np.random.rand(trials) * bait_power / 20))
-        minimum_node_size = np.floor(min_base + (np.random.rand(trials) * (fishing_level - zone_level) / 6) + np.floor(
-            np.random.rand(trials) * bait_power / 10))
+    _sample_node_resources_jit_fishing = _sample_node_resources_numpy_fishing
+    numba_available = False
+
+
+# Parallel sampling section
+# Trials are split into up to _MAX_CHUNKS chunks of at least _MIN_CHUNK trials. The layout only depends on
+# the number of trials, so results do not change with the thread or worker count, and batches of a few
+# thousand trials already spread over every thread.
+_MIN_CHUNK = 256
+_MAX_CHUNKS = 64
+# Smaller batches run their chunks in this process, the pool costs more than it saves
+_POOL_MIN_TRIALS = 65536
+_process_pool = None
+
+
+def _chunk_seeds(seed, trials):
+    chunks = min(_MAX_CHUNKS, max(1, -(-trials // _MIN_CHUNK)))
+    return np.random.SeedSequence(seed).generate_state(chunks).astype(np.int64)
+
+
+def _sample_node_resources_chunk(arguments):
+    return _sample_node_resources_numpy_fishing(*arguments)
+
+
+def _get_process_pool(workers):
+    global _process_pool
+    if (_process_pool is None) or (_process_pool[0] != workers):
+        if _process_pool is not None:
+            _process_pool[1].shutdown()
+        # Forking after numba has started can deadlock, so the workers are spawned
+        _process_pool = (workers, ProcessPoolExecutor(max_workers=workers,
+                                                      mp_context=multiprocessing.get_context('spawn')))
+    return _process_pool[1]
+
+
+@profiling.instrument
+def _sample_node_resources_fishing(zone_level, min_base, max_base, fishing_level, bait_power, trials, seed,
+                                   **kwargs):
+    """
+    Sample node sizes with the active backend. With parallel set the trials are split into fixed size chunks
+    with their own seeds and run on numba threads, or on a process pool of the given number of workers for
+    the numpy backend. The chunks only depend on trials, so a seed gives the same samples for any thread or
+    worker count.
+    """
+    backend = get_backend()
+    if backend == "cpp":
+        return _cpp_extern().sample_resources(zone_level, min_base, max_base, fishing_level, bait_power, trials,
+                                              seed)
+    if backend == "numba":
+        # Fixed argument types, so every call reuses the specialization compiled in warmup()
+        (zone_level, min_base, max_base, fishing_level, bait_power) = map(
+            float, (zone_level, min_base, max_base, fishing_level, bait_power))
+        trials = int(trials)
+    if not kwargs.get("parallel", False):
+        sampler = _sample_node_resources_jit_fishing if backend == "numba" else _sample_node_resources_numpy_fishing
+        return sampler(zone_level, min_base, max_base, fishing_level, bait_power, trials, seed)
+    seeds = _chunk_seeds(seed, trials)
+    if backend == "numba":
+        return _sample_node_resources_parallel_jit_fishing(zone_level, min_base, max_base, fishing_level,
+                                                           bait_power, trials, seeds)
+    chunk_size = -(-trials // len(seeds))
+    chunks = [(zone_level, min_base, max_base, fishing_level, bait_power,
+               min(chunk_size, trials - c * chunk_size), int(chunk_seed)) for (c, chunk_seed) in enumerate(seeds)]
+    if trials < _POOL_MIN_TRIALS:
+        return np.concatenate(list(map(_sample_node_resources_chunk, chunks)))
+    pool = _get_process_pool(kwargs.get("workers", None))
+    return np.concatenate(list(pool.map(_sample_node_resources_chunk, chunks)))
+
+
+@profiling.instrument
+def _tries_to_finish_node_fishing(table, node_resources, **kwargs):
+    if kwargs.get("parallel", False) and get_backend() == "numba":
+        return _tries_to_finish_parallel_jit_fishing(table, node_resources)
+    return _tries_to_finish_node(table, node_resources)
+
+
+# Backend section
+_BACKENDS = ("numba", "cpp", "numpy")
+_backend = None
+_cpp = None
+
+
+def _cpp_extern():
+    global _cpp
+    if _cpp is None:
+        from idlescape_cpp import fishing_extern
+        _cpp = fishing_extern()
+    return _cpp
+
+
+def available_backends():
+    """
+    Simulation backends usable in this environment, fastest first
+    """
+    backends = []
+    if numba_available:
+        backends.append("numba")
+    try:
+        _cpp_extern()
+        backends.append("cpp")
+    except (ImportError, OSError):
+        pass
+    backends.append("numpy")
+    return backends
+
+
+def set_backend(name=None):
+    """
+    Select the backend used by the fishing simulations: 'numba', 'cpp' or 'numpy'.
+    None picks the fastest available one. Returns the name of the active backend.
+    """
+    global _backend
+    available = available_backends()
+    if name is None:
+        name = available[0]
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown fishing backend {name}, expected one of {_BACKENDS}")
+    if name not in available:
+        raise ValueError(f"Fishing backend {name} is not available here, choose from {available}")
+    _backend = name
+    return _backend
+
+
+def get_backend():
+    """
+    Name of the active backend, selecting the fastest available one on first use
+    """
+    return _backend if _backend is not None else set_backend()
+
+
+def _kernel_seed(seed):
+    return int(np.random.default_rng(seed).integers(2 ** 31 - 1))
+
+
+@profiling.instrument
+def _calculate_node_resources_batch_fishing(zone_level, min_base, max_base, fishing_level, bait_power, trials,
+                                            seed=None):
+    """
+    Mean node size for many parameter tuples at once, the parameters are broadcast against each other
+    """
+    zone_level, min_base, max_base, fishing_level, bait_power = np.broadcast_arrays(
+        zone_level, min_base, max_base, fishing_level, bait_power)
+    if get_backend() == "cpp":
+        return _cpp_extern().calc_resources_batch(zone_level, min_base, max_base, fishing_level, bait_power,
+                                                  trials, _kernel_seed(seed))
+    seeds = np.random.SeedSequence(_kernel_seed(seed)).generate_state(zone_level.size).astype(np.int64)
+    result = np.empty(zone_level.shape)
+    for (i, index) in enumerate(np.ndindex(zone_level.shape)):
+        result[index] = np.mean(_sample_node_resources_fishing(
+            zone_level[index], min_base[index], max_base[index], fishing_level[index], bait_power[index], trials,
+            seeds[i]))
+    return result
+
+
+@profiling.instrument
+def _average_tries_to_finish_node_batch_fishing(base_chance, zone_level, min_base, max_base, fishing_level,
+                                                bait_power, fishing, trials, seed=None):
+    """
+    Mean reel attempts to empty a node for many parameter tuples at once, the parameters are broadcast
+    against each other
+    """
+    base_chance, zone_level, min_base, max_base, fishing_level, bait_power, fishing = np.broadcast_arrays(
+        base_chance, zone_level, min_base, max_base, fishing_level, bait_power, fishing)
+    if get_backend() == "cpp":
+        return _cpp_extern().average_trials_batch(base_chance, zone_level, min_base, max_base, fishing_level,
+                                                  bait_power, fishing, trials, _kernel_seed(seed))
+    seeds = np.random.SeedSequence(_kernel_seed(seed)).generate_state(zone_level.size).astype(np.int64)
+    result = np.empty(zone_level.shape)
+    for (i, index) in enumerate(np.ndindex(zone_level.shape)):
+        node_resources = _sample_node_resources_fishing(zone_level[index], min_base[index], max_base[index],
+                                                        fishing_level[index], bait_power[index], trials, seeds[i])
+        table = _tries_to_finish_table(float(base_chance[index]), int(fishing[index]))
+        result[index] = np.mean(_tries_to_finish_node(table, node_resources))
+    return result
+
+
+def _calculate_node_resources_jit_fishing(zone_level, min_base, max_base, fishing_level, bait_power, trials,
+                                          seed=None):
+    return float(_calculate_node_resources_batch_fishing(zone_level, min_base, max_base, fishing_level,
+                                                         bait_power, trials, seed))
+
+
+def _average_tries_to_finish_node_jit_fishing(base_chance, zone_level, min_base, max_base, fishing_level,
+                                              bait_power,
+                                              fishing, trials, seed=None):
+    return float(_average_tries_to_finish_node_batch_fishing(base_chance, zone_level, min_base, max_base,
+                                                             fishing_level, bait_power, fishing, trials, seed))
+
+
+@profiling.instrument
+def _adaptive_estimate(draw, **kwargs):
+    """
+    Mean of draw(trials, seed) samples, drawn in growing batches until the standard error falls below
+    relative_error * |mean|, the time budget (seconds) runs out, or max_trials is reached. With neither
+    target set exactly max_trials samples are used. Batch seeds come from a Generator built from seed,
+    so a given seed always reproduces the same estimate.
+    Returns (mean, standard_error, trials).
+    """
+    rng = np.random.default_rng(kwargs.get("seed", None))
+    relative_error = kwargs.get("relative_error", None)
+    time_budget = kwargs.get("time_budget", None)
+    max_trials = kwargs.get("max_trials", 10000)
+    batch = kwargs.get("batch", 1000)
+    start = time.perf_counter()
+    trials = 0
+    mean = 0.0
+    sum_squares = 0.0
+    standard_error = np.inf
+    while trials < max_trials:
+        samples = draw(min(batch, max_trials - trials), int(rng.integers(2 ** 31 - 1)))
+        # Combine batch moments (Chan et al.)
+        batch_mean = np.mean(samples)
+        delta = batch_mean - mean
+        combined = trials + len(samples)
+        mean += delta * len(samples) / combined
+        sum_squares += np.sum((samples - batch_mean) ** 2) + delta ** 2 * trials * len(samples) / combined
+        trials = combined
+        if trials > 1:
+            standard_error = np.sqrt(sum_squares / (trials - 1) / trials)
+        if (relative_error is not None) and (standard_error <= relative_error * abs(mean)):
+            break
+        if (time_budget is not None) and (time.perf_counter() - start >= time_budget):
+            break
+        batch *= 2
+    return mean, standard_error, trials
+
+
+# Tries to finish section
+@lru_cache(maxsize=1024)
+def _tries_to_finish_table(base_chance, fishing):
+    """
+    Expected reel attempts to empty a node, indexed by node size. Every catch past the point where
+    the odds reach 1 costs exactly one try, so the table stops there and is extended linearly.
+    """
+    chance = base_chance + fishing * 0.025
+    certain_size = max(0, int(np.ceil(48 * (1 - chance))))
+    n_res = np.arange(1, certain_size + 1)
+    never_tell_me_the_odds = np.minimum(1.0, chance + n_res / 48)
+    table = np.concatenate([[0.0], np.cumsum(1 / never_tell_me_the_odds)])
+    table.flags.writeable = False
+    return table
+
+
+def _tries_to_finish_node(table, node_resources):
+    """
+    Look up the expected reel attempts for an array of node sizes
+    """
+    node_resources = np.clip(node_resources, 0, None)
+    index = np.minimum(node_resources, len(table) - 1).astype(int)
+    return table[index] + (node_resources - index)
+
+
+# Exact node size distribution section
+def _floor_uniform_pmf(low, high):
+    """
+    Distribution of floor(x) for x drawn uniformly between low and high
+    """
+    low, high = min(low, high), max(low, high)
+    if high == low:
+        return np.array([np.floor(low)]), np.array([1.0])
+    values = np.arange(np.floor(low), np.ceil(high))
+    probabilities = (np.minimum(values + 1, high) - np.maximum(values, low)) / (high - low)
+    return values, probabilities
+
+
+def _sum_pmf(first, second):
+    """
+    Distribution of the sum of two independent integer valued variables
+    """
+    first_values, first_probabilities = first
+    second_values, second_probabilities = second
+    probabilities = np.convolve(first_probabilities, second_probabilities)
+    values = first_values[0] + second_values[0] + np.arange(len(probabilities))
+    return values, probabilities
+
+
+@profiling.instrument
+def _node_size_pmf_fishing(zone_level, min_base, max_base, fishing_level, bait_power):
+    """
+    Exact form of _calculate_node_resources_jit_fishing. Every random draw is either floored or a
+    single uniform, so the node size distribution is a convolution of a handful of discrete pieces.
+    Returns (sizes, probabilities).
+    """
+    level_delta = fishing_level - zone_level
+    max_values, max_probabilities = _sum_pmf(_floor_uniform_pmf(max_base, max_base + level_delta / 8),
+                                             _floor_uniform_pmf(0, bait_power / 20))
+    min_values, min_probabilities = _sum_pmf(_floor_uniform_pmf(min_base, min_base + level_delta / 6),
+                                             _floor_uniform_pmf(0, bait_power / 10))
+    lucky_chance = min(1.0, max(0.0, 0.05 + (bait_power / 2000)))
+    pair_probabilities = np.outer(max_probabilities, min_probabilities).ravel()
+    maximum_node_size = np.repeat(max_values, len(min_values))
+    minimum_node_size = np.tile(min_values, len(max_values))
+    # Lucky nodes scale both ends of the range
+    maximum_node_size = np.concatenate([maximum_node_size, maximum_node_size * 3.0])
+    minimum_node_size = np.concatenate([minimum_node_size, minimum_node_size * 1.5])
+    pair_probabilities = np.concatenate([pair_probabilities * (1 - lucky_chance), pair_probabilities * lucky_chance])
+
+    # The final size is floor(small + U * (delta + 1)), spread the pair weight over the covered bins
+    small = np.minimum(maximum_node_size, minimum_node_size)
+    width = np.abs(maximum_node_size - minimum_node_size) + 1
+    large = small + width
+    density = pair_probabilities / width
+    first = np.floor(small.min())
+    low_bin = (np.floor(small) - first).astype(int)
+    high_bin = (np.floor(large) - first).astype(int)
+    bins = high_bin.max() + 1
+    probabilities = np.bincount(low_bin, density * (np.floor(small) + 1 - small), bins)
+    probabilities += np.bincount(high_bin, density * (large - np.floor(large)), bins)
+    full_bins = np.bincount(low_bin + 1, density, bins + 1) - np.bincount(high_bin, density, bins + 1)
+    probabilities += np.cumsum(full_bins)[:bins]
+    return first + np.arange(bins), np.maximum(probabilities, 0)
+
+
+def _expected_tries_to_finish_node_fishing(base_chance, fishing, sizes, probabilities):
+    """
+    Average number of reel attempts for a node size distribution
+    """
+    return np.dot(_tries_to_finish_node(_tries_to_finish_table(base_chance, fishing), sizes), probabilities)
+
+
+# Node statistics grid section
+def _expected_node_grid_numpy_fishing(zone_level, min_base, max_base, fishing_level, bait_power, chance, tries):
+    result = np.zeros(len(fishing_level))
+    for g in range(len(fishing_level)):
+        sizes, probabilities = _node_size_pmf_fishing(zone_level, min_base, max_base, fishing_level[g],
+                                                      bait_power[g])
+        if tries:
+            result[g] = _expected_tries_to_finish_node_fishing(chance[g], 0, sizes, probabilities)
+        else:
+            result[g] = np.dot(sizes, probabilities)
+    return result
 
-        lucky_chance = 0.05 + (bait_power / 2000)
-        lucky_rolls = np.random.rand(trials) <= lucky_chance
-        minimum_node_size = minimum_node_size * (1 + 0.5 * lucky_rolls)
-        maximum_node_size = maximum_node_size * (1 + 2.0 * lucky_rolls)
 
-        delta = abs(maximum_node_size - minimum_node_size)
-        small = np.min([maximum_node_size, minimum_node_size], axis=0)
-        total_resources = sum(np.floor(np.random.rand(trials) * (delta + 1) + small))
-        return total_resources / trials
-
-
-    def _average_tries_to_finish_node_jit_fishing(base_chance, zone_level, min_base, max_base, fishing_level,
-                                                  bait_power,
-                                                  fishing, trials):
-        node_resources = np.array(
-            [int(_calculate_node_resources_jit_fishing(zone_level, min_base, max_base, fishing_level, bait_power, 1))
-             for
-             _ in range(trials)])
-        min_node_count = min(node_resources)
-        max_node_count = max(node_resources)
-        node_average = []
-        for total_node_resources in range(min_node_count, max_node_count + 1):
-            total_tries_sub = 0.0
-            for n_res in range(total_node_resources, 0, -1):
-                never_tell_me_the_odds = min(1.0, base_chance + fishing * 0.025 + n_res / 48)
-                total_tries_sub += 1 / never_tell_me_the_odds
-            node_average.append(total_tries_sub)
-        node_average = np.array(node_average)
-        return np.mean(node_average[(node_resources - min_node_count)])
\ No newline at end of file
+try:
+    from numba import jit, prange
+
+
+    @jit(nopython=True, cache=True)
+    def _floor_uniform_pmf_jit(low, high):
+        if high < low:
+            low, high = high, low
+        first = np.floor(low)
+        if high == low:
+            return first, np.ones(1)
+        count = int(np.ceil(high) - first)
+        probabilities = np.empty(count)
+        for i in range(count):
+            value = first + i
+            probabilities[i] = (min(value + 1, high) - max(value, low)) / (high - low)
+        return first, probabilities
+
+
+    @jit(nopython=True, cache=True)
+    def _integrated_floor_jit(x):
+        # Integral of floor(y) from 0 to x
+        k = np.floor(x)
+        return k * (k - 1) / 2 + k * (x - k)
+
+
+    @jit(nopython=True, cache=True)
+    def _integrated_tries_jit(x, table, cumulative):
+        # Integral of tries_to_finish(floor(y)) from 0 to x, the table is extended by one try per catch
+        if x <= 0:
+            return 0.0
+        k = np.floor(x)
+        last = len(table) - 1
+        if k <= last:
+            ki = int(k)
+            return cumulative[ki] + table[ki] * (x - k)
+        excess = k - 1 - last
+        below = cumulative[last + 1] + excess * table[last] + excess * (excess + 1) / 2
+        return below + (table[last] + k - last) * (x - k)
+
+
+    @jit(nopython=True, parallel=True, cache=True)
+    def _expected_node_grid_jit_fishing(zone_level, min_base, max_base, fishing_level, bait_power, chance, tries):
+        """
+        Expected node size (or reel attempts when tries is set) for every (fishing_level, bait_power, chance)
+        """
+        result = np.zeros(len(fishing_level))
+        for g in prange(len(fishing_level)):
+            level_delta = fishing_level[g] - zone_level
+            first_a, pmf_a = _floor_uniform_pmf_jit(max_base, max_base + level_delta / 8)
+            first_b, pmf_b = _floor_uniform_pmf_jit(0.0, bait_power[g] / 20)
+            first_max = first_a + first_b
+            max_probabilities = np.convolve(pmf_a, pmf_b)
+            first_a, pmf_a = _floor_uniform_pmf_jit(min_base, min_base + level_delta / 6)
+            first_b, pmf_b = _floor_uniform_pmf_jit(0.0, bait_power[g] / 10)
+            first_min = first_a + first_b
+            min_probabilities = np.convolve(pmf_a, pmf_b)
+            lucky_chance = min(1.0, max(0.0, 0.05 + (bait_power[g] / 2000)))
+
+            certain_size = max(0, int(np.ceil(48 * (1 - chance[g])))) if tries else 0
+            table = np.zeros(certain_size + 1)
+            cumulative = np.zeros(certain_size + 2)
+            for n_res in range(1, certain_size + 1):
+                table[n_res] = table[n_res - 1] + 1 / min(1.0, chance[g] + n_res / 48)
+            for n_res in range(certain_size + 1):
+                cumulative[n_res + 1] = cumulative[n_res] + table[n_res]
+
+            expected = 0.0
+            first_lucky = 0
+            if not tries:
+                # Without the lucky roll both ends are integers and the node size is uniform between them
+                for i in range(len(max_probabilities)):
+                    expected += (1 - lucky_chance) * max_probabilities[i] * (first_max + i) / 2
+                for j in range(len(min_probabilities)):
+                    expected += (1 - lucky_chance) * min_probabilities[j] * (first_min + j) / 2
+                first_lucky = 1
+            for i in range(len(max_probabilities)):
+                for j in range(len(min_probabilities)):
+                    weight = max_probabilities[i] * min_probabilities[j]
+                    if weight <= 0:
+                        continue
+                    for lucky in range(first_lucky, 2):
+                        lucky_weight = lucky_chance if lucky else 1 - lucky_chance
+                        maximum_node_size = (first_max + i) * (3.0 if lucky else 1.0)
+                        minimum_node_size = (first_min + j) * (1.5 if lucky else 1.0)
+                        small = min(maximum_node_size, minimum_node_size)
+                        width = abs(maximum_node_size - minimum_node_size) + 1
+                        if tries:
+                            value = (_integrated_tries_jit(small + width, table, cumulative)
+                                     - _integrated_tries_jit(small, table, cumulative)) / width
+                        else:
+                            value = (_integrated_floor_jit(small + width) - _integrated_floor_jit(small)) / width
+                        expected += weight * lucky_weight * value
+            result[g] = expected
+        return result
+
+except ImportError:
+    _expected_node_grid_jit_fishing = _expected_node_grid_numpy_fishing
+
+
+def warmup():
+    """
+    Compile every numba kernel (or load it from the on-disk cache) by running it once on tiny inputs with the
+    argument types real calls use, this also gets the thread pool going before the first calculation.
+    """
+    if not numba_available:
+        return
+    node_resources = _sample_node_resources_jit_fishing(1.0, 1.0, 2.0, 1.0, 0.0, 4, 0)
+    _sample_node_resources_parallel_jit_fishing(1.0, 1.0, 2.0, 1.0, 0.0, 4, _chunk_seeds(0, 4))
+    _tries_to_finish_parallel_jit_fishing(_tries_to_finish_table(0.5, 0), node_resources)
+    _expected_node_grid_jit_fishing(1.0, 1.0, 2.0, np.ones(1), np.zeros(1), np.full(1, 0.5), True)
@@ -1,8 +1,10 @@
 from abc import ABC
 
 import numpy as np
+from dataclasses import dataclass
 from .gathering import *
 from .character import *
+from . import profiling
 
 
 class Foraging(Gathering, ABC):
@@ -20,17 +22,24 @@ class Foraging(Gathering, ABC):
     def _effective_level(self):
         return self.player.foraging_level + self.player.foraging_bonus * (1 + self.player.foraging_set_bonus)
 
+    def _compute_stats(self):
+        return ForagingStats(nature=self.get_enchant("nature"),
+                             herbalist=self.get_enchant("herbalist"),
+                             seed_harvesting=self.get_enchant("seedHarvesting"),
+                             **self._gathering_stats())
+
     def _node_rates(self, location):
         frequency_dict = dict()
+        stats = self.stats
         for (k, v) in location.nodes.items():
             frequency = v.frequency
             # This can be modified based on special enchants
             if "tree" in v.tags:
-                frequency += self.get_enchant("nature")
+                frequency += stats.nature
             if "plants" in v.tags:
-                frequency += self.get_enchant("herbalist")
+                frequency += stats.herbalist
             if "seeds" in v.tags:
-                frequency += self.get_enchant("seedHarvesting")
+                frequency += stats.seed_harvesting
             frequency = min(v.max_frequency, frequency)
             frequency_dict[k] = max(0, frequency)
         total_frequency = sum([v for (k, v) in frequency_dict.items()])
@@ -45,13 +54,21 @@ class Foraging(Gathering, ABC):
     def _node_actions(self, location):
         return self._node_sizes(location)
 
+    @profiling.instrument
     def zone_action_rate(self, location_name):
         location = self.get_location_by_name(location_name)
-        if location.level > self.player.foraging_level:
+        stats = self.stats
+        if location.level > stats.level:
             return 0
-        haste = self.get_enchant('haste')
-        rate_modifier = (self._effective_level() + 99) / 100 * (1 + haste * 0.04)
+        rate_modifier = (stats.effective_level + 99) / 100 * (1 + stats.haste * 0.04)
         return rate_modifier * 3600000 / location.base_duration
 
 
-Gathering.register(Foraging)
\ No newline at end of file
+Gathering.register(Foraging)
+
+
+@dataclass(frozen=True)
+class ForagingStats(GatheringStats):
+    nature: float = 0
+    herbalist: float = 0
+    seed_harvesting: float = 0
@@ -1,6 +1,9 @@
 import numpy as np
-import json
+from . import datastore
+from . import profiling
+from .itemtable import ItemTable
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
 import pandas as pd
 
 
@@ -29,6 +32,41 @@ class Gathering(ABC):
     def action_name(self):
         pass
 
+    _stats = None
+    _stats_key = (None, None)
+
+    @property
+    def stats(self):
+        """
+        Frozen snapshot of the derived character stats, rebuilt only when the character changes
+        """
+        cached_player, cached_revision = self._stats_key
+        stale = (cached_player is not self.player) or (cached_revision != self.player.revision)
+        profiling.cache("Gathering.stats", not stale)
+        if stale:
+            self._stats = self._compute_stats()
+            self._stats_key = (self.player, self.player.revision)
+        return self._stats
+
+    def _compute_stats(self):
+        return GatheringStats(**self._gathering_stats())
+
+    def _gathering_stats(self):
+        return {
+            "level": getattr(self.player, self.primary_attribute),
+            "effective_level": self._effective_level(),
+            "haste": self.get_enchant("haste"),
+            "gathering": self.get_enchant("gathering"),
+            "empowered_gathering": self.get_enchant("empoweredGathering"),
+            "superheating": self.get_enchant("superheating"),
+            "empowered_superheating": self.get_enchant("empoweredSuperheating"),
+            "embers": self.get_enchant("embers"),
+        }
+
+    @abstractmethod
+    def _effective_level(self):
+        pass
+
     @abstractmethod
     def _node_rates(self, location):
         pass
@@ -61,80 +99,141 @@ class Gathering(ABC):
         zone_xp_list = [self.zone_experience_rate(loc.name) for (k, loc) in self.locations.items()]
         return max(zone_xp_list)
 
-    def _loot_rates(self, node):
-        frequency_dict = dict()
-        count_dict = dict()
+    @property
+    def item_table(self):
+        return ItemTable.for_items(self.items)
+
+    def _zone_table(self, location):
+        profiling.cache("Gathering._zone_table", location.table is not None)
+        if location.table is None:
+            location.table = ZoneTable(location, self.item_table, self.sh_table)
+        return location.table
+
+    def _relative_frequencies(self, table):
+        return np.maximum(0, np.minimum(table.loot_frequency, table.loot_max_frequency))
+
+    @profiling.instrument
+    def _loot_rates(self, location):
+        """
+        Items gained per node resource for every node of a zone.
+        Returns (item_ids, rates) where rates has one row per node and one column per item.
+        """
+        table = self._zone_table(location)
+        stats = self.stats
         # Apply gathering, superheat, embers, etc.
-        gathering = min(1, self.get_enchant("gathering") * 0.10)
-        empowered_gathering = min(1, self.get_enchant("empoweredGathering") * 0.10)
+        gathering = min(1, stats.gathering * 0.10)
+        empowered_gathering = min(1, stats.empowered_gathering * 0.10)
         total_gathering = 1 - (1 - gathering) * (1 - empowered_gathering)
-        superheat = min(1, self.get_enchant("superheating") * 0.01)
-        empowered_superheat = min(1, self.get_enchant("empoweredSuperheating") * 0.01)
+        superheat = min(1, stats.superheating * 0.01)
+        empowered_superheat = min(1, stats.empowered_superheating * 0.01)
         total_superheat = 1 - (1 - superheat) * (1 - empowered_superheat)
-        embers = self.get_enchant("embers") * 0.1
-        # Calculate frequency
-        for (idd, loot) in node.loot.items():
-            frequency = self._get_relative_frequency(loot)
-            frequency_dict[idd] = frequency_dict.get(idd, 0) + frequency
-            # Todo Put in SH and Embers
-        total_frequency = sum([v for (k, v) in frequency_dict.items()])
-        frequency_dict = {k: v / total_frequency for (k, v) in frequency_dict.items()}
-        # Collect items
-        for (idd, loot) in node.loot.items():
-            frequency = frequency_dict.get(idd, 0)
-            new_base_items = ((loot.min_amount + loot.max_amount) / 2 + total_gathering - total_superheat) * frequency
-            count_dict[idd] = count_dict.get(idd, 0) + new_base_items
-            if total_superheat > 0:
-                if idd in self.sh_table:
-                    sh_id = self.sh_table[idd]
-                    sh_count = total_superheat * frequency
-                    count_dict[sh_id] = count_dict.get(sh_id, 0) + sh_count
-                    lost_heat = sh_count * 1.5 * self.items[str(sh_id)].get('requiredResources', [{}])[0].get('2', 0)
-                    count_dict[2] = count_dict.get(2, 0) - lost_heat
-                    lost_fire = frequency * superheat * (1 - empowered_superheat)
-                    count_dict[512] = count_dict.get(512, 0) - lost_fire
-            if embers > 0:
-                new_heat = self.items[str(idd)].get('heat', 0) * embers * frequency
-                count_dict[2] = count_dict.get(2, 0) + new_heat
-            if gathering > 0:
-                lost_nature = frequency * gathering * 0.15 * (1 - empowered_gathering)
-                count_dict[517] = count_dict.get(517, 0) - lost_nature
-        return count_dict
-
-    def _get_relative_frequency(self, loot):
-        return max(0, np.min([loot.frequency, loot.max_frequency]))
+        embers = stats.embers * 0.1
+        # Calculate frequency, normalized within each node
+        frequency = self._relative_frequencies(table)
+        total_frequency = np.bincount(table.loot_node, frequency, len(table.node_ids))
+        frequency = frequency / total_frequency[table.loot_node]
+        # Collect items as (item, amount, loot row, order within the row)
+        rows = np.arange(len(frequency))
+        new_base_items = ((table.loot_min_amount + table.loot_max_amount) / 2 + total_gathering
+                          - total_superheat) * frequency
+        sources = [(table.loot_ids, new_base_items, rows, 0)]
+        if total_superheat > 0:
+            heated = table.sh_ids >= 0
+            sh_count = total_superheat * frequency[heated]
+            lost_heat = sh_count * 1.5 * table.sh_heat[heated]
+            lost_fire = frequency[heated] * superheat * (1 - empowered_superheat)
+            sources += [(table.sh_ids[heated], sh_count, rows[heated], 1),
+                        (np.full(len(sh_count), 2), -lost_heat, rows[heated], 2),
+                        (np.full(len(sh_count), 512), -lost_fire, rows[heated], 3)]
+        if embers > 0:
+            sources.append((np.full(len(rows), 2), table.loot_heat * embers * frequency, rows, 4))
+        if gathering > 0:
+            lost_nature = frequency * gathering * 0.15 * (1 - empowered_gathering)
+            sources.append((np.full(len(rows), 517), -lost_nature, rows, 5))
+        item_ids = np.concatenate([source[0] for source in sources])
+        amounts = np.concatenate([source[1] for source in sources])
+        loot_rows = np.concatenate([source[2] for source in sources])
+        appearance = np.concatenate([source[2] * 6 + source[3] for source in sources])
+        # Items are ordered by first appearance
+        order = np.argsort(appearance, kind='stable')
+        unique_ids, first, columns = np.unique(item_ids[order], return_index=True, return_inverse=True)
+        column_order = np.argsort(first)
+        rates = np.zeros((len(table.node_ids), len(unique_ids)))
+        np.add.at(rates, (table.loot_node[loot_rows[order]], columns.ravel()), amounts[order])
+        return unique_ids[column_order], rates[:, column_order]
 
     def list_of_actions(self):
         return list(self.locations.keys())
 
     def get_location_by_name(self, name):
-        if name not in self.list_of_actions():
+        if name not in self.locations:
             raise IndexError(f'{name} not in {self.list_of_actions()}')
         return self.locations[name]
 
+    _node_cache = (None, None)
+
+    def _node_statistics(self, location):
+        """
+        Node rates, average sizes and average actions of a zone as arrays in zone table order.
+        Cached until the character changes, so histograms and action rates share the work.
+        """
+        stats = self.stats
+        cached_stats, cache = self._node_cache
+        if cached_stats is not stats:
+            cache = dict()
+            self._node_cache = (stats, cache)
+        profiling.cache("Gathering._node_statistics", location in cache)
+        if location not in cache:
+            node_ids = self._zone_table(location).node_ids
+            node_rates = self._node_rates(location)
+            node_sizes = self._node_sizes(location)
+            node_actions = self._node_actions(location)
+            cache[location] = (np.array([node_rates[name] for name in node_ids]),
+                               np.array([node_sizes[name] for name in node_ids]),
+                               np.array([node_actions[name] for name in node_ids]))
+        return cache[location]
+
+    def _location_item_rates(self, location, interval):
+        """
+        Items per action (or per hour) of a zone, returned as (item_ids, rates)
+        """
+        rates, avg_sizes, actions = self._node_statistics(location)
+        action_rate = self.zone_action_rate(location.name) if (interval == 'hour') else 1
+        item_ids, loot_rates = self._loot_rates(location)
+        items = (rates * avg_sizes * action_rate) @ loot_rates
+        total_actions = np.dot(actions, rates)
+        return item_ids, items / total_actions
+
+    @profiling.instrument
     def location_item_histogram(self, location_name, **kwargs):
         location = self.get_location_by_name(location_name)
         key = kwargs.get('key', 'name')
         interval = kwargs.get('interval', 'action')
-
-        node_rates = self._node_rates(location)
-        node_sizes = self._node_sizes(location)
-        node_actions = self._node_actions(location)
-        action_rate = self.zone_action_rate(location_name) if (interval == 'hour') else 1
-
-        items = dict()
-        total_actions = 0
-        for (name, rate) in node_rates.items():
-            avg_size = node_sizes[name]
-            total_actions += node_actions[name] * rate
-            loot_rates = self._loot_rates(location.nodes[name])
-            for (itemid, count) in loot_rates.items():
-                item_node_rate = count * avg_size * rate * action_rate
-                items[itemid] = items.get(itemid, 0) + item_node_rate
+        item_ids, item_rates = self._location_item_rates(location, interval)
+        if key == 'name':
+            return pd.Series(item_rates, index=self.item_table.name_of(item_ids).tolist())
+        else:
+            return pd.Series(item_rates, index=item_ids.tolist())
+
+    @profiling.instrument
+    def all_location_histograms(self, **kwargs):
+        """
+        Item histograms of every zone in one table, zones as rows and items as columns
+        (ordered by first appearance). Accepts the same key and interval options as location_item_histogram.
+        """
+        key = kwargs.get('key', 'name')
+        interval = kwargs.get('interval', 'action')
+        zone_rates = [self._location_item_rates(location, interval) for location in self.locations.values()]
+        item_ids = pd.unique(np.concatenate([ids for (ids, rates) in zone_rates])) if zone_rates else np.array([])
+        columns = {idd: i for (i, idd) in enumerate(item_ids)}
+        table = np.zeros((len(zone_rates), len(item_ids)))
+        for (row, (ids, rates)) in enumerate(zone_rates):
+            table[row, [columns[idd] for idd in ids]] = rates
         if key == 'name':
-            return pd.Series({self.items[str(k)]['name']: v / total_actions for (k, v) in items.items()})
+            item_labels = self.item_table.name_of(item_ids).tolist()
         else:
-            return pd.Series({k: v / total_actions for (k, v) in items.items()})
+            item_labels = [int(idd) for idd in item_ids]
+        return pd.DataFrame(table, index=list(self.locations.keys()), columns=item_labels)
 
     def set_location_data(self, new_data):
         self.locations = self._select_action_locations(new_data)
@@ -142,8 +241,7 @@ class Gathering(ABC):
     def _select_action_locations(self, input_data):
         locations = None
         if isinstance(input_data, str):
-            with open(input_data) as j:
-                locations = json.load(j)
+            locations = datastore.load_json(input_data)
         else:
             locations = input_data
         results = dict()
@@ -154,49 +252,66 @@ class Gathering(ABC):
                 loc_duration = v.get("baseDuration", 0)
                 loc_level = find_required_level(v)
                 loc_experience = find_location_xp(v)
-                this_location = Location(loc_name, loc_id, self.action_name, loc_duration, loc_level, loc_experience)
                 node_list = v.get("nodes", [{"nodeID": "",
                                              "frequency": 1,
                                              "minimumBaseAmount": 1,
                                              "loot": v.get("loot", [])}])
-                for node in node_list:
-                    node_id = node.get("nodeID", "")
-                    node_frequency = node.get("frequency", 1)
-                    node_max_freq = node.get("maxFrequency", node_frequency)
-                    node_min_base = node.get("minimumBaseAmount", 1)
-                    node_max_base = node.get("maximumBaseAmount", node_min_base)
-                    node_tags = node.get("tags", [])
-                    this_node = Node(node_id, node_frequency, node_max_freq, node_min_base, node_max_base, node_tags)
-                    for loot in node["loot"]:
-                        loot_id = loot.get("id", 0)
-                        loot_freq = loot.get("frequency", 1)
-                        loot_max_freq = loot.get("maxFrequency", loot_freq)
-                        loot_min_amount = loot.get("minAmount", 1)
-                        loot_max_amount = loot.get("maxAmount", loot_min_amount)
-                        item_class = self.items[str(loot_id)].get("class", "")
-                        this_loot = NodeLoot(loot_id, loot_freq, loot_max_freq, loot_min_amount, loot_max_amount,
-                                             item_class)
-                        this_node.loot[loot["id"]] = this_loot
-                    this_location.nodes[node["nodeID"]] = this_node
+                this_location = Location(loc_name, loc_id, self.action_name, loc_duration, loc_level, loc_experience,
+                                         node_data=node_list, item_table=self.item_table)
                 results[v['name']] = this_location
         return results
 
 
+@dataclass(frozen=True)
+class GatheringStats:
+    """
+    Derived character stats and enchantment levels for a gathering skill
+    """
+    level: float
+    effective_level: float
+    haste: float = 0
+    gathering: float = 0
+    empowered_gathering: float = 0
+    superheating: float = 0
+    empowered_superheating: float = 0
+    embers: float = 0
+
+
 class Location:
-    def __init__(self, name, loc_id, action_type, base_duration, level, experience):
+    """
+    A gathering zone. Nodes and their loot are built from the raw node data on first access.
+    """
+    __slots__ = ('name', 'loc_id', 'action_type', 'base_duration', 'level', 'experience', 'table',
+                 '_nodes', '_node_data', '_item_table')
+
+    def __init__(self, name, loc_id, action_type, base_duration, level, experience, node_data=None,
+                 item_table=None):
         self.name = name
         self.loc_id = loc_id
         self.action_type = action_type
         self.base_duration = base_duration
         self.level = level
         self.experience = experience
-        self.nodes = dict()
+        self.table = None
+        self._nodes = None if node_data is not None else dict()
+        self._node_data = node_data
+        self._item_table = item_table
+
+    @property
+    def nodes(self):
+        if self._nodes is None:
+            self._nodes = build_nodes(self._node_data, self._item_table)
+            self._node_data = None
+        return self._nodes
 
     def list_of_nodes(self):
         return self.nodes.keys()
 
 
 class Node:
+    __slots__ = ('node_id', 'frequency', 'max_frequency', 'minimum_base_amount', 'maximum_base_amount', 'tags',
+                 'loot')
+
     def __init__(self, node_id, frequency, max_frequency, minimum_base_amount, maximum_base_amount, tags):
         self.node_id = node_id
         self.frequency = frequency
@@ -211,6 +326,8 @@ class Node:
 
 
 class NodeLoot:
+    __slots__ = ('id', 'frequency', 'max_frequency', 'min_amount', 'max_amount', 'item_class')
+
     def __init__(self, idd, frequency, max_frequency, min_amount, max_amount, item_class):
         self.id = idd
         self.frequency = frequency
@@ -220,6 +337,75 @@ class NodeLoot:
         self.item_class = item_class
 
 
+def build_nodes(node_list, item_table):
+    nodes = dict()
+    loot_rows = item_table.rows([loot.get("id", 0) for node in node_list for loot in node["loot"]])
+    loot_classes = [item_table.classes[code] for code in item_table.class_code[loot_rows]]
+    loot_index = 0
+    for node in node_list:
+        node_id = node.get("nodeID", "")
+        node_frequency = node.get("frequency", 1)
+        node_max_freq = node.get("maxFrequency", node_frequency)
+        node_min_base = node.get("minimumBaseAmount", 1)
+        node_max_base = node.get("maximumBaseAmount", node_min_base)
+        node_tags = node.get("tags", [])
+        this_node = Node(node_id, node_frequency, node_max_freq, node_min_base, node_max_base, node_tags)
+        for loot in node["loot"]:
+            loot_id = loot.get("id", 0)
+            loot_freq = loot.get("frequency", 1)
+            loot_max_freq = loot.get("maxFrequency", loot_freq)
+            loot_min_amount = loot.get("minAmount", 1)
+            loot_max_amount = loot.get("maxAmount", loot_min_amount)
+            item_class = loot_classes[loot_index]
+            loot_index += 1
+            this_loot = NodeLoot(loot_id, loot_freq, loot_max_freq, loot_min_amount, loot_max_amount, item_class)
+            this_node.loot[loot["id"]] = this_loot
+        nodes[node["nodeID"]] = this_node
+    return nodes
+
+
+class ZoneTable:
+    """
+    Struct-of-arrays form of a Location. Node columns are indexed by node, loot columns are stored
+    CSR style with loot_offsets marking where each node starts.
+    """
+
+    def __init__(self, location, item_table, sh_table):
+        nodes = list(location.nodes.values())
+        self.node_ids = list(location.nodes.keys())
+        self.node_frequency = np.array([node.frequency for node in nodes], dtype=float)
+        self.node_max_frequency = np.array([node.max_frequency for node in nodes], dtype=float)
+        self.node_min_base = np.array([node.minimum_base_amount for node in nodes], dtype=float)
+        self.node_max_base = np.array([node.maximum_base_amount for node in nodes], dtype=float)
+        self.node_tags = [node.tags for node in nodes]
+
+        loot = [(n, node_loot) for (n, node) in enumerate(nodes) for node_loot in node.loot.values()]
+        self.loot_offsets = np.cumsum([0] + [len(node.loot) for node in nodes])
+        self.loot_node = np.array([n for (n, node_loot) in loot], dtype=int)
+        self.loot_ids = np.array([node_loot.id for (n, node_loot) in loot], dtype=int)
+        self.loot_frequency = np.array([node_loot.frequency for (n, node_loot) in loot], dtype=float)
+        self.loot_max_frequency = np.array([node_loot.max_frequency for (n, node_loot) in loot], dtype=float)
+        self.loot_min_amount = np.array([node_loot.min_amount for (n, node_loot) in loot], dtype=float)
+        self.loot_max_amount = np.array([node_loot.max_amount for (n, node_loot) in loot], dtype=float)
+        self.classes = sorted({node_loot.item_class for (n, node_loot) in loot})
+        self.loot_class = np.array([self.classes.index(node_loot.item_class) for (n, node_loot) in loot],
+                                   dtype=int)
+        self.loot_heat = item_table.column('heat', item_table.rows(self.loot_ids))
+        # Superheat targets and the heat each one costs
+        self.sh_ids = np.array([sh_table.get(node_loot.id, -1) for (n, node_loot) in loot], dtype=int)
+        self.sh_heat = np.zeros(len(self.sh_ids))
+        has_target = self.sh_ids >= 0
+        self.sh_heat[has_target] = item_table.column('required_heat', item_table.rows(self.sh_ids[has_target]))
+
+    def is_class(self, item_class):
+        """
+        Boolean mask of the loot rows belonging to an item class
+        """
+        if item_class not in self.classes:
+            return np.zeros(len(self.loot_class), dtype=bool)
+        return self.loot_class == self.classes.index(item_class)
+
+
 def find_required_level(df):
     try:
         return df["accessRequirements"]["requiredSkills"][0]["level"]
@@ -0,0 +1,80 @@
+import numpy as np
+
+
+class ItemTable:
+    """
+    Dense, integer indexed columns of the item data.
+
+    Rows are sorted by item id, so ``rows`` maps ids to rows with a binary search and every column
+    can be gathered with plain array indexing. Unknown ids and names raise KeyError.
+    """
+
+    def __init__(self, item_data):
+        records = sorted(((int(k), v) for (k, v) in item_data.items()), key=lambda x: x[0])
+        self.ids = np.array([idd for (idd, v) in records], dtype=int)
+        self.names = np.array([v.get('name', '') for (idd, v) in records], dtype=object)
+        self.classes = sorted({v.get('class', '') for (idd, v) in records})
+        self.class_code = np.array([self.classes.index(v.get('class', '')) for (idd, v) in records], dtype=int)
+        self.heat = self._column(records, 'heat')
+        self.size = self._column(records, 'size')
+        self.difficulty = self._column(records, 'difficulty')
+        self.bonus_difficulty_xp = self._column(records, 'bonusDifficultyXP')
+        self.value = self._column(records, 'value')
+        # Heat spent to make the item, used by superheating
+        self.required_heat = np.array([v.get('requiredResources', [{}])[0].get('2', 0) for (idd, v) in records],
+                                      dtype=float)
+        self.name_rows = {name: row for (row, name) in enumerate(self.names)}
+
+    @classmethod
+    def for_items(cls, item_data):
+        """
+        Table shared by everything holding the same item data. The table is kept on the data itself (loaded
+        data is a datastore.FrozenDict), so it lives exactly as long as the data. Plain dicts cannot hold it and
+        get a new table every call.
+        """
+        table = getattr(item_data, '_item_table', None)
+        if table is None:
+            table = cls(item_data)
+            try:
+                item_data._item_table = table
+            except AttributeError:
+                pass
+        return table
+
+    @staticmethod
+    def _column(records, name):
+        return np.array([v.get(name, 0) for (idd, v) in records], dtype=float)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def rows(self, ids):
+        """
+        Rows of the given item ids
+        """
+        ids = np.asarray(ids, dtype=int)
+        rows = np.searchsorted(self.ids, ids)
+        found = (rows < len(self.ids)) & (self.ids[np.minimum(rows, len(self.ids) - 1)] == ids)
+        if not np.all(found):
+            raise KeyError(str(ids[~found].ravel()[0]))
+        return rows
+
+    def rows_by_name(self, names):
+        """
+        Rows of the given item names
+        """
+        return np.array([self.name_rows[name] for name in names], dtype=int)
+
+    def name_of(self, ids):
+        return self.names[self.rows(ids)]
+
+    def column(self, name, rows):
+        """
+        Values of a column for the given rows
+        """
+        return getattr(self, name)[np.asarray(rows, dtype=int)]
+
+    def is_class(self, item_class, rows):
+        if item_class not in self.classes:
+            return np.zeros(len(rows), dtype=bool)
+        return self.class_code[rows] == self.classes.index(item_class)
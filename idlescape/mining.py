@@ -3,6 +3,7 @@ from abc import ABC
 import numpy as np
 from .gathering import *
 from .character import *
+from . import profiling
 
 
 class Mining(Gathering, ABC):
@@ -49,12 +50,13 @@ class Mining(Gathering, ABC):
     def _node_actions(self, location):
         return self._node_sizes(location)
 
+    @profiling.instrument
     def zone_action_rate(self, location_name):
         location = self.get_location_by_name(location_name)
-        if location.level > self.player.mining_level:
+        stats = self.stats
+        if location.level > stats.level:
             return 0
-        haste = self.get_enchant('haste')
-        rate_modifier = (self._effective_level() + 99) / 100 * (1 + haste * 0.04)
+        rate_modifier = (stats.effective_level + 99) / 100 * (1 + stats.haste * 0.04)
         return rate_modifier * 3600000 / location.base_duration
 
 
@@ -0,0 +1,140 @@
+"""
+Opt-in instrumentation of the model hot paths.
+
+Instrumented functions record call counts and cumulative wall time, caches record hits and misses.
+Recording is off by default and costs a single flag check per call; turn it on with the
+IDLESCAPE_PROFILE=1 environment variable, ``enable()``, or for a block of code:
+
+    with profiling.profile():
+        fishing.location_item_histogram('Still Lake')
+    profiling.statistics_frame()
+"""
+import functools
+import os
+import time
+from contextlib import contextmanager
+
+_enabled = os.environ.get("IDLESCAPE_PROFILE", "").lower() not in ("", "0", "false", "no")
+# name -> [calls, total_time, hits, misses]
+_records = dict()
+
+
+def enabled():
+    return _enabled
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def reset():
+    """
+    Forget everything recorded so far
+    """
+    _records.clear()
+
+
+@contextmanager
+def profile(**kwargs):
+    """
+    Record everything run inside the block, previous records are cleared unless reset=False
+    """
+    global _enabled
+    if kwargs.get("reset", True):
+        reset()
+    previous = _enabled
+    _enabled = True
+    try:
+        yield
+    finally:
+        _enabled = previous
+
+
+def _record(name):
+    if name not in _records:
+        _records[name] = [0, 0.0, 0, 0]
+    return _records[name]
+
+
+def instrument(name=None):
+    """
+    Decorator recording calls and cumulative wall time of a function, under its qualified name by default.
+    Usable bare (@instrument) or with a name (@instrument("fishing.kernel")).
+    """
+    def decorator(func):
+        label = name if isinstance(name, str) else func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record = _record(label)
+                record[0] += 1
+                record[1] += time.perf_counter() - start
+        return wrapper
+
+    if callable(name):
+        return decorator(name)
+    return decorator
+
+
+@contextmanager
+def timer(name):
+    """
+    Record a block of code as one call of name
+    """
+    if not _enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record = _record(name)
+        record[0] += 1
+        record[1] += time.perf_counter() - start
+
+
+def cache(name, hit):
+    """
+    Count a cache lookup
+    """
+    if _enabled:
+        _record(name)[2 if hit else 3] += 1
+
+
+def statistics():
+    """
+    Everything recorded, as {name: {calls, total_time, mean_time, hits, misses, hit_rate}}
+    """
+    result = dict()
+    for (name, (calls, total_time, hits, misses)) in sorted(_records.items()):
+        result[name] = {
+            "calls": calls,
+            "total_time": total_time,
+            "mean_time": total_time / calls if calls else 0.0,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if (hits + misses) else float("nan"),
+        }
+    return result
+
+
+def statistics_frame():
+    """
+    statistics() as a DataFrame, slowest entry points first
+    """
+    import pandas as pd
+    columns = ["calls", "total_time", "mean_time", "hits", "misses", "hit_rate"]
+    frame = pd.DataFrame.from_dict(statistics(), orient="index", columns=columns)
+    return frame.sort_values("total_time", ascending=False)
@@ -1,5 +1,6 @@
 import numpy as np
-from copy import copy, deepcopy
+from copy import copy
+from .character import CharacterOverlay
 
 
 class Sequencer:
@@ -32,11 +33,23 @@ class Sequencer:
         self.hour_sequencer = sorted(self.hour_sequencer, key=lambda x: x['hours'])
 
     def simulate_by_time(self, time_axis, **kwargs):
+        """
+        Level and experience rate at every time (hours) of an evenly spaced time_axis.
+
+        mode='event' (default) evaluates the experience rate once per distinct state and jumps straight to the
+        next level up or sequence event, mode='step' re-evaluates it at every step. Both give the same arrays.
+        Returns (level_axis, experience_rate, sequence_log).
+        """
+        if kwargs.get('mode', 'event') == 'step':
+            return self._simulate_by_step(time_axis, **kwargs)
+        return self._simulate_by_event(time_axis, **kwargs)
+
+    def _simulate_by_step(self, time_axis, **kwargs):
         level_axis = []
         custom_xp = kwargs.get('custom_xp', False)
         xp_gen = ExperienceTable() if custom_xp else RSExperienceTable()
         action_clone = copy(self.action)
-        player_clone = deepcopy(self.player)
+        player_clone = CharacterOverlay(self.player)
         action_clone.player = player_clone
         hour_sequencer = copy(self.hour_sequencer)
         level_sequencer = copy(self.level_sequencer)
@@ -76,7 +89,122 @@ class Sequencer:
         return level_axis, experience_rate, sequence_log
 
 
-class ExperienceTable:
+    def _simulate_by_event(self, time_axis, **kwargs):
+        time_axis = np.asarray(time_axis)
+        custom_xp = kwargs.get('custom_xp', False)
+        xp_gen = ExperienceTable() if custom_xp else RSExperienceTable()
+        action_clone = copy(self.action)
+        player_clone = CharacterOverlay(self.player)
+        action_clone.player = player_clone
+        steps = len(time_axis)
+        delta_t = time_axis[1] - time_axis[0]
+        level_axis = np.empty(steps, dtype=xp_gen.levels.dtype)
+        experience_rate = np.empty(steps)
+        sequence_log = []
+        # Tick at which each hour event first applies
+        hour_ticks = np.searchsorted(time_axis, [seq['hours'] for seq in self.hour_sequencer], side='left')
+        rates = dict()
+        total_experience = 0
+        current_level = None
+        hours_active = 0
+        levels_active = 0
+        tick = 0
+        while tick < steps:
+            state = (current_level, hours_active, levels_active)
+            if state not in rates:
+                rates[state] = action_clone.get_maximum_experience()
+            rate = rates[state]
+            gained = rate * delta_t
+            # Ticks until the next hour event, and an estimate of the ticks until the next level up
+            horizon = steps - tick
+            if hours_active < len(hour_ticks):
+                horizon = min(horizon, max(1, hour_ticks[hours_active] - tick + 1))
+            reached = xp_gen.level(total_experience)
+            to_next = (xp_gen.experience(reached) + xp_gen.xp_to_next[reached - xp_gen.levels[0]]
+                       - total_experience)
+            if (gained > 0) and np.isfinite(to_next):
+                to_level = to_next / gained
+                horizon = min(horizon, max(1, int(np.ceil(to_level)) + 1))
+            # Same sequential sums as stepping one tick at a time
+            experience = np.cumsum(np.concatenate([[total_experience], np.full(horizon, gained)]))[1:]
+            levels = xp_gen.level(experience)
+            if current_level is None:
+                # The first tick replaces the starting level
+                horizon = 1
+            else:
+                changed = np.flatnonzero(levels != current_level)
+                if len(changed) > 0:
+                    horizon = changed[0] + 1
+            level_axis[tick:tick + horizon] = levels[:horizon]
+            experience_rate[tick:tick + horizon] = gained / delta_t
+            total_experience = experience[horizon - 1]
+            tick += horizon
+            # Apply the state at the end of the segment
+            current_level = levels[horizon - 1]
+            setattr(player_clone, self.action_type, current_level)
+            hours_active = int(np.searchsorted(hour_ticks, tick - 1, side='right'))
+            for hour_sequence in self.hour_sequencer[:hours_active]:
+                self._apply_sequence(player_clone, hour_sequence, 'hours')
+            levels_active = sum(seq['level'] <= current_level for seq in self.level_sequencer)
+            for level_sequence in self.level_sequencer[:levels_active]:
+                self._apply_sequence(player_clone, level_sequence, 'level')
+        return level_axis, experience_rate, sequence_log
+
+    @staticmethod
+    def _apply_sequence(player, sequence, trigger):
+        for (k, v) in sequence.items():
+            if (k != trigger) and (k != 'info'):
+                if 'enchantments' in k:
+                    subkey = k.split(':')[-1]
+                    player.enchantments[subkey] = max(player.enchantments.get(subkey, 0), v)
+                else:
+                    setattr(player, k, max(getattr(player, k), v))
+
+
+class _ExperienceLookup:
+    """
+    Lookups shared by the experience tables, scalars or arrays of any shape in and out.
+    Subclasses fill levels (1..199) and the increasing total_xp needed to reach each of them.
+    """
+    levels = None
+    total_xp = None
+
+    def _precompute(self):
+        # Experience from each level to the next, infinite at the last level
+        self.xp_to_next = np.append(np.diff(self.total_xp), np.inf)
+
+    def _index(self, experience):
+        return np.maximum(np.searchsorted(self.total_xp, experience, side='right') - 1, 0)
+
+    def experience(self, level):
+        """
+        Total experience of a level, fractional levels interpolate linearly between levels.
+        Raises ValueError for levels outside the table.
+        """
+        level = np.asarray(level)
+        if np.any((level < self.levels[0]) | (level > self.levels[-1])):
+            raise ValueError(f"Levels must be between {self.levels[0]} and {self.levels[-1]}")
+        if np.issubdtype(level.dtype, np.integer):
+            result = self.total_xp[level - self.levels[0]]
+        else:
+            result = np.interp(level, self.levels, self.total_xp)
+        return result[()]
+
+    def level(self, experience, fractional=False):
+        """
+        Level reached with the given total experience, with fractional=True the progress towards
+        the next level is added as a fraction. Raises ValueError for negative experience.
+        """
+        if np.any(np.asarray(experience) < self.total_xp[0]):
+            raise ValueError("Experience must not be negative")
+        index = self._index(np.asarray(experience))
+        if not fractional:
+            return self.levels[index][()]
+        progress = (np.asarray(experience) - self.total_xp[index]) / self.xp_to_next[index]
+        return (self.levels[index] + np.clip(progress, 0, 1))[()]
+
+
+class ExperienceTable(_ExperienceLookup):
     """
     Generate the RS xp table
     """
@@ -86,15 +214,10 @@ class ExperienceTable:
         self.total_xp = np.floor(
             50e3 * (self.levels - 1 + ((self.levels - 1) / 10) ** 2 + np.heaviside(self.levels - 101, 0) * (
                     (self.levels - 101) / 2) ** 3))
+        self._precompute()
 
-    def experience(self, level):
-        return self.total_xp[level == self.levels][0]
-
-    def level(self, experience):
-        return self.levels[experience >= self.total_xp][-1]
 
-
-class RSExperienceTable:
+class RSExperienceTable(_ExperienceLookup):
     """
     Generate the RS xp table
     """
@@ -104,9 +227,102 @@ class RSExperienceTable:
         self.delta = np.roll(0.25 * np.floor((self.levels - 1 + 300 * 2 ** ((self.levels - 1) / 7))), 1)
         self.delta[0] = 0
         self.total_xp = np.floor(np.cumsum(self.delta))
+        self._precompute()
 
-    def experience(self, level):
-        return self.total_xp[level == self.levels][0]
 
-    def level(self, experience):
-        return self.levels[experience >= self.total_xp][-1]
+_SKILLS = {'mining': ('.mining', 'Mining'), 'foraging': ('.foraging', 'Foraging'), 'fishing': ('.fishing', 'Fishing')}
+
+
+def _load_shared_data(loaded):
+    # The data parsed by the parent process, every scenario run by this worker then shares it
+    from . import datastore
+    datastore.preload(loaded)
+
+
+def _run_scenario(scenario):
+    """
+    Run one scenario, returning its tidy curve (see run_scenarios)
+    """
+    import importlib
+    import pandas as pd
+    from . import datastore
+    from .character import Character
+    module, name = _SKILLS[scenario['skill'].lower()]
+    action_class = getattr(importlib.import_module(module, __package__), name)
+    player = Character(**scenario.get('character', {}))
+    action = action_class(player, scenario.get('locations', datastore.data_file("locations.json")),
+                          **scenario.get('action', {}))
+    time_axis = np.asarray(scenario['time_axis'])
+    sequencer = Sequencer(action, sequence=scenario.get('sequence', []))
+    level_axis, experience_rate, sequence_log = sequencer.simulate_by_time(
+        time_axis, custom_xp=scenario.get('custom_xp', False))
+    return pd.DataFrame({
+        'scenario': scenario.get('name'),
+        'skill': scenario['skill'].lower(),
+        'hours': time_axis,
+        'level': level_axis,
+        'experience_rate': experience_rate,
+    })
+
+
+def iter_scenarios(scenarios, **kwargs):
+    """
+    Run scenarios over a process pool and yield (index, curve) as each one completes, see run_scenarios.
+    workers=1 runs them in this process, in order.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from . import datastore
+    from .character import select_items
+    scenarios = [dict(scenario, name=scenario.get('name', i)) for (i, scenario) in enumerate(scenarios)]
+    workers = kwargs.get('workers', None)
+    if workers == 1:
+        for (i, scenario) in enumerate(scenarios):
+            yield i, _run_scenario(scenario)
+        return
+    # Parse the data once here and hand it to every worker
+    select_items(datastore.data_file("items.json"))
+    default_locations = kwargs.get('locations', datastore.data_file("locations.json"))
+    for locations in {scenario.get('locations', default_locations) for scenario in scenarios}:
+        datastore.load_json(locations)
+    # Forking after numba has started can deadlock, so the workers are spawned
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_load_shared_data,
+                             initargs=(datastore.loaded(),)) as pool:
+        futures = {pool.submit(_run_scenario, scenario): i for (i, scenario) in enumerate(scenarios)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def run_scenarios(scenarios, **kwargs):
+    """
+    Simulate many progression plans in parallel. The item and location data is parsed once in this process and
+    handed to every worker, which shares it between the scenarios it runs.
+
+    Parameters
+    ----------
+    scenarios : list of dict
+        Each with 'skill' ('mining', 'foraging' or 'fishing') and 'time_axis' (hours), and optionally
+        'name', 'character' (Character keyword arguments), 'sequence' (Sequencer events), 'action'
+        (skill keyword arguments, e.g. accuracy), 'locations' (location file) and 'custom_xp'.
+    workers : int, optional
+        Worker processes, all cores by default
+    callback : callable, optional
+        Called with (index, curve) as each scenario completes
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per scenario and time: scenario, skill, hours, level, experience_rate,
+        in the order the scenarios were given
+    """
+    import pandas as pd
+    callback = kwargs.get('callback', None)
+    curves = dict()
+    for (i, curve) in iter_scenarios(scenarios, **kwargs):
+        curves[i] = curve
+        if callback is not None:
+            callback(i, curve)
+    if not curves:
+        return pd.DataFrame(columns=['scenario', 'skill', 'hours', 'level', 'experience_rate'])
+    return pd.concat([curves[i] for i in sorted(curves)], ignore_index=True)
@@ -1,11 +1,10 @@
-import json
+from . import datastore
 import numpy as np
 
 
 class Smithing:
     def __init__(self, character, forge_list, **kwargs):
-        with open(forge_list) as json_file:
-            self.forges = json.load(json_file)
+        self.forges = datastore.load_json(forge_list)
         self.player = character
 
     def information(self, forge, bar, intensity):
@@ -1,4 +1,4 @@
-import json
+from .. import datastore
 import nlopt
 import numpy as np
 
@@ -6,8 +6,7 @@ import numpy as np
 class CraftingExperience:
 
     def __init__(self, data_file, **kwargs):
-        with open(data_file) as dat:
-            self.item_data = json.load(dat)
+        self.item_data = datastore.load_json(data_file)
         self.items = {v['name']: v for (k, v) in self.item_data.items()}
         self.id_to_name = {k: v['name'] for (k, v) in self.item_data.items()}
         self.name_to_id = {v: k for (k, v) in self.id_to_name.items()}
@@ -1,61 +1,120 @@
 #include <random>
-#include <iostream>
-#include <string>
-#include <functional>
-#include <fstream>
+#include <cmath>
+#include <cstdint>
+#include <algorithm>
 #include <vector>
 
+// Every call owns its engines, seeded from the seed argument and the index of the parameter tuple, so the
+// functions are safe to call from several threads and the batch loops can run in parallel (build with
+// -fopenmp) without changing the results.
+
+namespace {
+
+std::mt19937_64 make_engine(uint64_t seed, uint64_t index){
+    std::seed_seq sequence{(uint32_t)(seed & 0xffffffff), (uint32_t)(seed >> 32),
+                           (uint32_t)(index & 0xffffffff), (uint32_t)(index >> 32)};
+    return std::mt19937_64(sequence);
+}
+
+double draw_resources(std::mt19937_64 &engine, int zone_level, int min_base, int max_base, double fishing_level,
+                      double bait_power){
+    std::uniform_real_distribution<double> randy(0, 1);
+    double max_node = std::floor(max_base + (randy(engine) * (fishing_level-zone_level)/8) +
+                                 std::floor(randy(engine)*bait_power/20));
+    double min_node = std::floor(min_base + (randy(engine) * (fishing_level-zone_level)/6) +
+                                 std::floor(randy(engine)*bait_power/10));
+
+    double lucky_chance = 0.05 + (bait_power / 2000);
+    if( randy(engine) <= lucky_chance ){
+        min_node *= 1.5;
+        max_node *= 3.0;
+    }
+
+    double delta = std::fabs(min_node - max_node);
+    double small = std::min(min_node, max_node);
+    return std::floor(randy(engine)*(delta + 1) + small);
+}
+
+// Expected reel attempts to empty a node, indexed by node size, the same table as _tries_to_finish_table in
+// fishing.py. Past the size where the odds reach 1 every catch costs exactly one try.
+std::vector<double> tries_table(double base_chance, int fishing){
+    double chance = base_chance + fishing*0.025;
+    int certain_size = std::max(0, (int)std::ceil(48*(1 - chance)));
+    std::vector<double> table(certain_size + 1);
+    table[0] = 0;
+    for(int i=1; i<=certain_size; i++){
+        table[i] = table[i-1] + 1/std::min(1.0, chance + i/48.0);
+    }
+    return table;
+}
+
+double expected_tries(const std::vector<double> &table, double node_resources){
+    double n_res = std::max(0.0, node_resources);
+    int index = (int)std::min(n_res, (double)(table.size() - 1));
+    return table[index] + (n_res - index);
+}
+
+}
+
 extern "C" {
-std::default_random_engine engine;
-std::uniform_int_distribution<int> fish_dist(0, 10);
-std::uniform_int_distribution<int> low_bases(1, 5);
-std::uniform_int_distribution<int> base_delta(0, 11);
-std::uniform_int_distribution<int> zones(0,4);
-std::vector<int> zone_values{1, 20, 50, 65, 85};
-std::uniform_real_distribution<double> reals(0, 1);
-
-auto randy = std::bind(reals, engine);
-auto base = std::bind(low_bases, engine);
-auto base_up = std::bind(base_delta, engine);
-auto zone = std::bind(zones, engine);
-auto fishy = std::bind(fish_dist, engine);
-
-double calc_resources(int zone_level, int min_base, int max_base, double fishing_level, double bait_power, int trials){
-    // zone_levels: N(1:100)
-    // min_base: N(1:10)
-    // max_base: N(2:20)
-    // fishing_level: U(1:500)
-    // bait_power: U(1:500)
-    double total_resources = 0;
+
+void sample_resources(int zone_level, int min_base, int max_base, double fishing_level, double bait_power,
+                      int trials, uint64_t seed, double *out){
+    std::mt19937_64 engine = make_engine(seed, 0);
     for(int i=0; i<trials; i++){
-        double max_node = floor(max_base + (randy() * (fishing_level-zone_level)/8) + floor(randy()*bait_power/20));
-        double min_node = floor(min_base + (randy() * (fishing_level-zone_level)/6) + floor(randy()*bait_power/10));
+        out[i] = draw_resources(engine, zone_level, min_base, max_base, fishing_level, bait_power);
+    }
+}
 
-        double lucky_chance = 0.05 + (bait_power / 2000);
-        if( randy() <= lucky_chance ){
-            min_node *= 1.5;
-            max_node *= 3.0;
+void calc_resources_batch(int n, const int *zone_level, const int *min_base, const int *max_base,
+                          const double *fishing_level, const double *bait_power, int trials, uint64_t seed,
+                          double *out){
+    #pragma omp parallel for schedule(dynamic)
+    for(int j=0; j<n; j++){
+        std::mt19937_64 engine = make_engine(seed, j);
+        double total_resources = 0;
+        for(int i=0; i<trials; i++){
+            total_resources += draw_resources(engine, zone_level[j], min_base[j], max_base[j], fishing_level[j],
+                                              bait_power[j]);
         }
-
-        double delta = abs(min_node - max_node);
-        double small = std::min(min_node, max_node);
-        total_resources += floor(randy()*(delta + 1) + small);
+        out[j] = total_resources / trials;
     }
-    return total_resources / trials;
 }
 
-double average_trials(double base_chance, int zone_level, int min_base, int max_base, double fishing_level,
-                      double bait_power, int fishing, int nodes) {
-    double total_tries = 0;
-    for(int i=0; i<nodes; i++){
-        double node_resources = calc_resources(zone_level, min_base, max_base, fishing_level, bait_power, 1);
-        while(node_resources > 0){
-            total_tries++;
-            if(randy() < (base_chance + fishing*0.025 + node_resources/48)){
-                node_resources--;
-            }
+void average_trials_batch(int n, const double *base_chance, const int *zone_level, const int *min_base,
+                          const int *max_base, const double *fishing_level, const double *bait_power,
+                          const int *fishing, int nodes, uint64_t seed, double *out){
+    #pragma omp parallel for schedule(dynamic)
+    for(int j=0; j<n; j++){
+        std::mt19937_64 engine = make_engine(seed, j);
+        std::vector<double> table = tries_table(base_chance[j], fishing[j]);
+        double total_tries = 0;
+        for(int i=0; i<nodes; i++){
+            double node_resources = draw_resources(engine, zone_level[j], min_base[j], max_base[j],
+                                                   fishing_level[j], bait_power[j]);
+            total_tries += expected_tries(table, node_resources);
         }
+        out[j] = total_tries / nodes;
     }
-    return total_tries / nodes;
+}
+
+double calc_resources(int zone_level, int min_base, int max_base, double fishing_level, double bait_power,
+                      int trials, uint64_t seed){
+    // zone_levels: N(1:100)
+    // min_base: N(1:10)
+    // max_base: N(2:20)
+    // fishing_level: U(1:500)
+    // bait_power: U(1:500)
+    double out;
+    calc_resources_batch(1, &zone_level, &min_base, &max_base, &fishing_level, &bait_power, trials, seed, &out);
+    return out;
+}
+
+double average_trials(double base_chance, int zone_level, int min_base, int max_base, double fishing_level,
+                      double bait_power, int fishing, int nodes, uint64_t seed) {
+    double out;
+    average_trials_batch(1, &base_chance, &zone_level, &min_base, &max_base, &fishing_level, &bait_power,
+                         &fishing, nodes, seed, &out);
+    return out;
 }
 }
@@ -6,30 +6,99 @@ from glob import glob
 c_int = ct.c_int
 c_double = ct.c_double
 c_float = ct.c_float
+c_uint64 = ct.c_uint64
 c_void_p = ct.c_void_p
 c_char_p = ct.c_char_p
 c_double_pointer = ct.POINTER(c_double)
 c_int_pointer = ct.POINTER(c_int)
-libname = glob(
+libraries = glob(
     os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fishing.*.so')
-)[0]
+)
+libname = libraries[0] if libraries else None
+
 
 class fishing_extern:
+    """
+    ctypes wrapper of the compiled fishing simulation, built by setup.py. The batch functions take
+    arrays of parameters (broadcast against each other) and return one estimate per tuple.
+    """
+
     def __init__(self):
+        if libname is None:
+            raise OSError("idlescape_cpp fishing library is not built, run `pip install .` or "
+                          "`python setup.py build_ext --inplace`")
         self.lib = ct.cdll.LoadLibrary(libname)
         self._init_functions()
 
     def _init_functions(self):
         self._calc_resources = self.lib.calc_resources
         self._calc_resources.restype = c_double
-        self._calc_resources.argtypes = [c_int, c_int, c_int, c_double, c_double, c_int]
+        self._calc_resources.argtypes = [c_int, c_int, c_int, c_double, c_double, c_int, c_uint64]
 
         self._average_trials = self.lib.average_trials
         self._average_trials.restype = c_double
-        self._average_trials.argtypes = [c_double, c_int, c_int, c_int, c_double, c_double, c_int, c_int]
+        self._average_trials.argtypes = [c_double, c_int, c_int, c_int, c_double, c_double, c_int, c_int, c_uint64]
+
+        self._sample_resources = self.lib.sample_resources
+        self._sample_resources.restype = None
+        self._sample_resources.argtypes = [c_int, c_int, c_int, c_double, c_double, c_int, c_uint64,
+                                           c_double_pointer]
+
+        self._calc_resources_batch = self.lib.calc_resources_batch
+        self._calc_resources_batch.restype = None
+        self._calc_resources_batch.argtypes = [c_int, c_int_pointer, c_int_pointer, c_int_pointer,
+                                               c_double_pointer, c_double_pointer, c_int, c_uint64,
+                                               c_double_pointer]
+
+        self._average_trials_batch = self.lib.average_trials_batch
+        self._average_trials_batch.restype = None
+        self._average_trials_batch.argtypes = [c_int, c_double_pointer, c_int_pointer, c_int_pointer,
+                                               c_int_pointer, c_double_pointer, c_double_pointer, c_int_pointer,
+                                               c_int, c_uint64, c_double_pointer]
+
+    @staticmethod
+    def _pointer(array, pointer_type):
+        return array.ctypes.data_as(pointer_type)
+
+    def calc_resources(self, zone_level, min_base, max_base, fishing_level, bait_power, trials, seed=0):
+        return self._calc_resources(zone_level, min_base, max_base, fishing_level, bait_power, trials, seed)
+
+    def average_trials(self, base_chance, zone_level, min_base, max_base, fishing_level, bait_power, fishing, trials,
+                       seed=0):
+        return self._average_trials(base_chance, zone_level, min_base, max_base, fishing_level, bait_power, fishing,
+                                    trials, seed)
+
+    def sample_resources(self, zone_level, min_base, max_base, fishing_level, bait_power, trials, seed=0):
+        out = np.empty(trials, dtype=np.float64)
+        self._sample_resources(int(zone_level), int(min_base), int(max_base), float(fishing_level),
+                               float(bait_power), trials, seed, self._pointer(out, c_double_pointer))
+        return out
 
-    def calc_resources(self, zone_level, min_base, max_base, fishing_level, bait_power, trials):
-        return self._calc_resources(zone_level, min_base, max_base, fishing_level, bait_power, trials)
+    def calc_resources_batch(self, zone_level, min_base, max_base, fishing_level, bait_power, trials, seed=0):
+        zone_level, min_base, max_base, fishing_level, bait_power = np.broadcast_arrays(
+            zone_level, min_base, max_base, fishing_level, bait_power)
+        shape = zone_level.shape
+        ints = [np.ascontiguousarray(x.ravel(), dtype=np.intc) for x in (zone_level, min_base, max_base)]
+        doubles = [np.ascontiguousarray(x.ravel(), dtype=np.float64) for x in (fishing_level, bait_power)]
+        out = np.empty(ints[0].size, dtype=np.float64)
+        self._calc_resources_batch(out.size, *[self._pointer(x, c_int_pointer) for x in ints],
+                                   *[self._pointer(x, c_double_pointer) for x in doubles], trials, seed,
+                                   self._pointer(out, c_double_pointer))
+        return out.reshape(shape)
 
-    def average_trials(self, base_chance, zone_level, min_base, max_base, fishing_level, bait_power, fishing, trials):
-        return self._average_trials(base_chance, zone_level, min_base, max_base, fishing_level, bait_power, fishing, trials)
+    def average_trials_batch(self, base_chance, zone_level, min_base, max_base, fishing_level, bait_power, fishing,
+                             trials, seed=0):
+        base_chance, zone_level, min_base, max_base, fishing_level, bait_power, fishing = np.broadcast_arrays(
+            base_chance, zone_level, min_base, max_base, fishing_level, bait_power, fishing)
+        shape = zone_level.shape
+        chance = np.ascontiguousarray(base_chance.ravel(), dtype=np.float64)
+        ints = [np.ascontiguousarray(x.ravel(), dtype=np.intc) for x in (zone_level, min_base, max_base)]
+        doubles = [np.ascontiguousarray(x.ravel(), dtype=np.float64) for x in (fishing_level, bait_power)]
+        fishing = np.ascontiguousarray(fishing.ravel(), dtype=np.intc)
+        out = np.empty(chance.size, dtype=np.float64)
+        self._average_trials_batch(out.size, self._pointer(chance, c_double_pointer),
+                                   *[self._pointer(x, c_int_pointer) for x in ints],
+                                   *[self._pointer(x, c_double_pointer) for x in doubles],
+                                   self._pointer(fishing, c_int_pointer), trials, seed,
+                                   self._pointer(out, c_double_pointer))
+        return out.reshape(shape)
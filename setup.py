@@ -1,5 +1,7 @@
 import os
+import tempfile
 from setuptools import setup, Extension
+from setuptools.command.build_ext import build_ext
 
 VERSION = "0.0.2"
 
@@ -9,15 +11,45 @@ def read(fname):
 extensions = [
     Extension(
         "fishing",
-        ["idlescape_cpp/fishing.cpp"]
+        ["idlescape_cpp/fishing.cpp"],
+        language="c++",
+        extra_compile_args=["-O3", "-std=c++11"],
     )
 ]
 
+
+class BuildExt(build_ext):
+    """
+    Build with OpenMP when the compiler supports it, so the batch loops in fishing.cpp run in parallel
+    """
+
+    def build_extensions(self):
+        if self._supports_openmp():
+            for extension in self.extensions:
+                extension.extra_compile_args.append("-fopenmp")
+                extension.extra_link_args.append("-fopenmp")
+        super().build_extensions()
+
+    def _supports_openmp(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "openmp.cpp")
+            with open(source, "w") as test:
+                test.write("#include <omp.h>\nint main() { return omp_get_max_threads() < 1; }\n")
+            try:
+                objects = self.compiler.compile([source], output_dir=directory, extra_postargs=["-fopenmp"])
+                self.compiler.link_executable(objects, os.path.join(directory, "openmp"),
+                                              extra_postargs=["-fopenmp"])
+            except Exception:
+                return False
+        return True
+
+
 setup(
     name = "idlescape",
     version = VERSION,
-    packages=['idlescape', 'idlescape.dashboard'],
+    packages=['idlescape', 'idlescape.dashboard', 'idlescape_cpp'],
     package_data={"idlescape": ["data/*"]},
-    #ext_package="idlescape_cpp",
-    #ext_modules=extensions,
+    ext_package="idlescape_cpp",
+    ext_modules=extensions,
+    cmdclass={"build_ext": BuildExt},
 )
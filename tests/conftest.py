@@ -0,0 +1,7 @@
+import pytest
+from idlescape import datastore
+
+
+@pytest.fixture
+def locations():
+    return datastore.data_file("locations.json")
@@ -0,0 +1,78 @@
+import warnings
+import numpy as np
+import pandas as pd
+import pytest
+from idlescape.augmenting import Augmenting, evaluate_parameters, latin_hypercube
+
+BOUNDS = {'base_probability': (0.85, 0.95), 'level_scaling': (1.0, 2.0), 'exp_scale': (10, 30),
+          'old_chances': (0.0, 0.1)}
+
+
+def test_batched_evaluation_matches_single_models():
+    parameters = latin_hypercube(BOUNDS, 40, seed=2)
+    levels = np.arange(1, 201, 7)
+    # Chunks smaller than the candidate count so results are stitched together
+    curves = evaluate_parameters(parameters, levels, item_tier=4, cost_level=[50, 120], chunk=16)
+    assert curves['mean_augment'].shape == (40, len(levels))
+    assert curves['mean_experience'].shape == (40, len(levels))
+    assert curves['mean_cost'].shape == (40, 2, len(Augmenting.x_values))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for candidate in range(40):
+            model = Augmenting(**{name: values[candidate] for (name, values) in parameters.items()})
+            np.testing.assert_allclose(curves['mean_augment'][candidate], model.mean_augment(levels))
+            np.testing.assert_allclose(curves['mean_experience'][candidate], model.mean_experience(4, levels))
+            np.testing.assert_allclose(curves['mean_cost'][candidate], model.mean_cost(np.array([50, 120]), 1.0, 0.1))
+
+
+def test_batch_accepts_frames_and_rejects_unknown_names():
+    parameters = pd.DataFrame(latin_hypercube(BOUNDS, 5, seed=1))
+    model = Augmenting.batch(parameters)
+    assert model.mean_experience(5, np.arange(1, 11)).shape == (5, 10)
+    with pytest.raises(ValueError):
+        Augmenting.batch({'not_a_parameter': [1.0]})
+
+
+def test_latin_hypercube_stays_in_bounds_and_is_stratified():
+    samples = latin_hypercube(BOUNDS, 50, seed=3)
+    for (name, (low, high)) in BOUNDS.items():
+        strata = np.floor((samples[name] - low) / (high - low) * 50)
+        assert np.array_equal(np.sort(strata), np.arange(50))
+
+
+def test_simulations_match_the_analytic_model():
+    model = Augmenting()
+    levels = np.array([10.0, 80.0, 180.0])
+    failure_pdf, statistics = model.probability_distribution(levels)
+    # probability_distribution counts the failed attempt, the simulation the level reached
+    histogram = model.simulate_histogram(levels, trials=50000, seed=1)
+    np.testing.assert_allclose(histogram[:, :-1], failure_pdf[:, 1:], atol=0.01)
+    final_level, attempts = model.simulate_batch(levels, trials=50000, seed=1)
+    np.testing.assert_allclose(np.mean(final_level, axis=-1) + 1, statistics['mean'], rtol=0.02)
+    np.testing.assert_array_equal(attempts, final_level + 1)
+    for target in (3, 8):
+        expected = model.mean_cost_target(target, levels, 1.0, 0.1)
+        np.testing.assert_allclose(model.simulate_cost(target, levels, 1.0, 0.1, trials=50000, seed=2), expected,
+                                   rtol=0.03)
+        costs = model.simulate_cost_distribution(target, levels, 1.0, 0.1, trials=50000, seed=2)
+        np.testing.assert_allclose(np.nanmean(costs, axis=-1), expected, rtol=0.03)
+
+
+def test_broadcast_costs_match_scalar_calls():
+    model = Augmenting()
+    levels = np.array([1.0, 40.0, 100.0, 199.0])
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        costs = model.mean_cost(levels, 1.0, 0.1)
+        targets = model.mean_cost_target(np.array([[2], [6], [12]]), levels, np.array([[1.0], [2.0], [5.0]]), 0.3)
+        experience = model.mean_experience(np.array([[3], [6]]), levels)
+    assert costs.shape == (len(levels), len(model.x_values))
+    assert targets.shape == (3, len(levels))
+    # Unreachable targets cost inf
+    assert np.isinf(costs[0, -1])
+    for (i, level) in enumerate(levels):
+        np.testing.assert_allclose(costs[i], model.mean_cost(level, 1.0, 0.1))
+        for (j, (target, base_cost)) in enumerate(zip((2, 6, 12), (1.0, 2.0, 5.0))):
+            assert targets[j, i] == pytest.approx(model.mean_cost_target(target, level, base_cost, 0.3))
+        for (j, tier) in enumerate((3, 6)):
+            assert experience[j, i] == pytest.approx(model.mean_experience(tier, level))
+    np.testing.assert_allclose(model.mean_augment(levels), [model.mean_augment(level)[0] for level in levels])
@@ -0,0 +1,24 @@
+import json
+from idlescape import bench, fishing
+
+
+def test_fishing_benchmarks_run_on_every_backend():
+    backend = fishing.get_backend()
+    results = bench.run(repeat=1, only="Fishing.location_item_histogram")
+    rows = results["results"]
+    assert [row["backend"] for row in rows] == fishing.available_backends()
+    assert results["meta"]["available_backends"] == fishing.available_backends()
+    for row in rows:
+        assert row["name"] == "Fishing.location_item_histogram"
+        assert "skipped" not in row
+        assert len(row["times"]) == 1
+        assert 0 < row["best"] <= row["mean"]
+    assert fishing.get_backend() == backend
+
+
+def test_other_benchmarks_run_once_and_write_json(tmp_path):
+    output = tmp_path / "bench.json"
+    bench.main(["--repeat", "2", "--only", "Augmenting.mean_cost", "--backend", "numpy", "--output", str(output)])
+    rows = json.loads(output.read_text())["results"]
+    assert [row["parameters"] for row in rows] == [{}, {"levels": 200}]
+    assert all((row["backend"] == fishing.get_backend()) and (len(row["times"]) == 2) for row in rows)
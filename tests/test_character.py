@@ -0,0 +1,99 @@
+import copy
+import numpy as np
+import pytest
+from idlescape.character import Character, CharacterOverlay, Enchantments
+from idlescape.mining import Mining
+from idlescape.sequencer import Sequencer
+
+
+def test_assigned_enchantments_belong_to_the_character():
+    first = Character(enchantments={'haste': 1})
+    second = Character()
+    second.enchantments = first.enchantments
+    assert second.enchantments is not first.enchantments
+    assert second.enchantments.owner is second
+    revisions = (first.revision, second.revision)
+    second.enchantments['haste'] = 3
+    assert first.enchantments['haste'] == 1
+    assert (first.revision, second.revision) == (revisions[0], revisions[1] + 1)
+
+
+@pytest.mark.parametrize("make", [lambda: Character(enchantments={'haste': 1}),
+                                  lambda: CharacterOverlay(Character(), enchantments={'haste': 1})])
+def test_copies_own_their_enchantments(make):
+    player = make()
+    clone = copy.copy(player)
+    assert clone.enchantments is not player.enchantments
+    assert clone.enchantments.owner is clone
+    (revision, clone_revision) = (player.revision, clone.revision)
+    clone.enchantments['haste'] = 3
+    assert player.enchantments['haste'] == 1
+    assert player.revision == revision
+    assert clone.revision != clone_revision
+
+
+def test_copied_character_gets_fresh_gathering_stats(locations):
+    player = Character(mining_level=50)
+    clone = copy.copy(player)
+    mining = Mining(clone, locations)
+    haste = mining.stats.haste
+    clone.enchantments['haste'] = 4
+    assert mining.stats.haste != haste
+    assert Mining(player, locations).stats.haste == haste
+
+
+def test_enchantment_changes_bump_the_revision():
+    player = Character()
+    assert isinstance(player.enchantments, Enchantments)
+    revision = player.revision
+    player.enchantments['haste'] = 2
+    player.enchantments.update(gathering=1)
+    player.enchantments.pop('haste')
+    assert player.revision == revision + 3
+
+
+def test_overlay_reads_through_and_never_writes_the_base():
+    base = Character(mining_level=30, mining_bonus=10, enchantments={'haste': 1})
+    revision = base.revision
+    overlay = CharacterOverlay(base, mining_level=60, enchantments={'haste': 2})
+    assert (overlay.mining_level, overlay.mining_bonus) == (60, 10)
+    assert overlay.item_data is base.item_data
+    overlay.mining_bonus = 25
+    overlay.enchantments['gathering'] = 3
+    assert (base.mining_level, base.mining_bonus) == (30, 10)
+    assert dict(base.enchantments) == {'haste': 1}
+    assert base.revision == revision
+    # Base changes show through attributes the overlay has not set, and change its revision
+    overlay_revision = overlay.revision
+    base.foraging_level = 50
+    assert overlay.foraging_level == 50
+    assert overlay.revision != overlay_revision
+
+
+def test_overlay_copies_the_base_enchantments():
+    base = Character(enchantments={'haste': 1})
+    overlay = CharacterOverlay(base)
+    overlay.enchantments['haste'] = 4
+    assert base.enchantments['haste'] == 1
+    assert overlay.enchantments.owner is overlay
+
+
+def test_sequencer_leaves_the_character_untouched(locations):
+    player = Character(enchantments={'haste': 1})
+    before = (dict(vars(player)), dict(player.enchantments), player.revision)
+    sequence = [{'level': 10, 'mining_bonus': 30}, {'hours': 5, 'enchantments:haste': 3}]
+    Sequencer(Mining(player, locations), sequence=sequence).simulate_by_time(np.linspace(0, 20, 41))
+    assert (dict(vars(player)), dict(player.enchantments), player.revision) == before
+
+
+def test_overlay_deepcopy_is_independent():
+    base = Character(mining_level=30, enchantments={'haste': 1})
+    overlay = CharacterOverlay(base, mining_level=60, enchantments={'haste': 2})
+    clone = copy.deepcopy(overlay)
+    assert (clone.mining_level, dict(clone.enchantments)) == (60, {'haste': 2})
+    assert clone.base is not base
+    assert clone.enchantments.owner is clone
+    revision = overlay.revision
+    clone.enchantments['haste'] = 5
+    clone.base.mining_bonus = 20
+    assert (overlay.enchantments['haste'], base.mining_bonus, overlay.revision) == (2, 0, revision)
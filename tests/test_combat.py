@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from idlescape import combat
+from idlescape.combat import Combat, Combatant, CombatantBatch
+
+STATS = dict(attack=[1, 20, 45, 80], defense=[1, 15, 60, 90], strength=[5, 20, 40, 70], agility=[0, 10, 30, 60],
+             protection=[0, 25, 80, 150], defense_mastery=[0, 5, 10, 20], attack_mastery=[0, 3, 8, 12],
+             offensive_affinity=[1.0, 1.2, 0.8, 1.5], hitpoints=[20, 60, 150, 300], speed=[2.4, 2.0, 3.0, 1.6])
+
+
+def _combatants(count=4):
+    enchantments = [{}, {'Hard to Hit': 2}, {'Rooted': 1, 'Ice Armor': 3}, {}]
+    return [Combatant(**{name: values[i] for (name, values) in STATS.items()}, enchantments=enchantments[i])
+            for i in range(count)]
+
+
+def test_matrices_match_pairwise_calls():
+    model = Combat()
+    attackers = _combatants()
+    defenders = _combatants()[::-1]
+    hit = model.chance_to_hit_matrix(attackers, defenders)
+    damage = model.damage_matrix(attackers, defenders)
+    assert hit.shape == damage.shape == (4, 4)
+    for (i, attacker) in enumerate(attackers):
+        for (j, defender) in enumerate(defenders):
+            assert hit[i, j] == pytest.approx(model.chance_to_hit(attacker, defender))
+            assert damage[i, j] == pytest.approx(model.damage_to_target(attacker, defender))
+
+
+def test_batches_stack_combatants():
+    batch = CombatantBatch.from_combatants(_combatants())
+    assert len(batch) == 4
+    assert np.array_equal(batch.attack, STATS['attack'])
+    assert np.array_equal(batch.enchantments['Rooted'], [0, 0, 1, 0])
+    assert CombatantBatch.from_combatants(batch) is batch
+    direct = CombatantBatch(attack=STATS['attack'], defense=5, enchantments={'Rooted': 1})
+    assert np.array_equal(direct.defense, [5, 5, 5, 5])
+    assert np.array_equal(direct.enchantments['Rooted'], [1, 1, 1, 1])
+
+
+def _encounter_parameters(pairs):
+    # hit, damage multiplier, max hit, speed and hitpoints of the attacker, then of the defender
+    rng = np.random.default_rng(4)
+    return [rng.uniform(0.3, 1.0, pairs), rng.uniform(0.5, 1.0, pairs), rng.integers(5, 30, pairs).astype(float),
+            rng.uniform(1.5, 3.0, pairs), rng.uniform(50, 200, pairs), rng.uniform(0.3, 1.0, pairs),
+            rng.uniform(0.5, 1.0, pairs), rng.integers(5, 30, pairs).astype(float), rng.uniform(1.5, 3.0, pairs),
+            rng.uniform(50, 200, pairs)]
+
+
+def test_encounter_kernels_agree():
+    parameters = _encounter_parameters(3)
+    fights = 20000
+    seeds = np.random.SeedSequence(1).generate_state(-(-3 * fights // combat._ENCOUNTER_CHUNK)).astype(np.int64)
+    results = [kernel(*parameters, fights, 3600.0, seeds)
+               for kernel in (combat._simulate_encounters_numpy, combat._simulate_encounters_jit)]
+    for (times, outcomes) in results:
+        assert np.all(np.isin(outcomes, [-1, 0, 1]))
+    ((numpy_times, numpy_outcomes), (jit_times, jit_outcomes)) = results
+    numpy_wins = np.mean(numpy_outcomes.reshape(3, fights) > 0, axis=1)
+    jit_wins = np.mean(jit_outcomes.reshape(3, fights) > 0, axis=1)
+    assert np.allclose(numpy_wins, jit_wins, atol=0.02)
+    assert np.allclose(np.mean(numpy_times.reshape(3, fights), axis=1), np.mean(jit_times.reshape(3, fights), axis=1),
+                       rtol=0.02)
+
+
+def test_simulate_encounters():
+    model = Combat()
+    strong = Combatant(attack=90, strength=80, hitpoints=300, speed=2.0)
+    weak = Combatant(defense=1, hitpoints=40, speed=3.0)
+    result = model.simulate_encounters(strong, [weak, strong], fights=2000, seed=9, respawn=5.0)
+    again = model.simulate_encounters(strong, [weak, strong], fights=2000, seed=9, respawn=5.0)
+    assert np.array_equal(result['time_to_kill'], again['time_to_kill'], equal_nan=True)
+    assert result['time_to_kill'].shape == (2, 2000)
+    assert result['death_probability'][0] == 0
+    # Mirror matches go both ways, the attacker swinging first on ties wins slightly more often
+    assert 0.3 < result['death_probability'][1] < 0.5
+    won = ~np.isnan(result['time_to_kill'][0])
+    assert np.all(won)
+    assert result['mean_kills_per_hour'][0] == pytest.approx(3600 / np.mean(result['time_to_kill'][0] + 5.0))
+    with pytest.raises(ValueError):
+        model.simulate_encounters(strong, Combatant(speed=0), fights=10)
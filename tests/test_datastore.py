@@ -0,0 +1,59 @@
+import copy
+import json
+import pickle
+import pytest
+from idlescape import datastore
+
+
+@pytest.fixture
+def data_path(tmp_path):
+    path = tmp_path / "data.json"
+    path.write_text(json.dumps({"1": {"name": "a", "tags": [1, 2]}, "2": {"name": "b", "tags": []}}))
+    datastore.clear()
+    yield str(path)
+    datastore.clear()
+
+
+def _add_suffix(data):
+    for value in data.values():
+        value["name"] += "!"
+    return data
+
+
+def test_load_json_is_shared_and_frozen(data_path):
+    data = datastore.load_json(data_path)
+    assert datastore.load_json(data_path) is data
+    assert data["1"]["tags"] == (1, 2)
+    with pytest.raises(TypeError):
+        data["3"] = {}
+    with pytest.raises(TypeError):
+        data["1"]["name"] = "c"
+    thawed = datastore.thaw(data)
+    thawed["1"]["name"] = "c"
+    assert data["1"]["name"] == "a"
+
+
+def test_frozen_data_survives_pickle_and_copy(data_path):
+    data = datastore.load_json(data_path)
+    for clone in (pickle.loads(pickle.dumps(data)), copy.deepcopy(data)):
+        assert clone == data
+        assert isinstance(clone, datastore.FrozenDict)
+
+
+def test_edited_source_is_parsed_again(data_path):
+    data = datastore.load_json(data_path, transform=_add_suffix)
+    assert data["1"]["name"] == "a!"
+    assert datastore.load_json(data_path) is not data
+    with open(data_path, "w") as source:
+        json.dump({"1": {"name": "changed", "tags": []}}, source)
+    assert datastore.load_json(data_path, transform=_add_suffix)["1"]["name"] == "changed!"
+
+
+def test_preload_shares_data_between_processes(data_path):
+    data = datastore.load_json(data_path)
+    loaded = pickle.loads(pickle.dumps(datastore.loaded()))
+    datastore.clear()
+    datastore.preload(loaded)
+    assert len(loaded) == 1
+    assert datastore.load_json(data_path) is next(iter(loaded.values()))
+    assert datastore.load_json(data_path) == data
@@ -0,0 +1,191 @@
+import numpy as np
+import pytest
+from idlescape import fishing
+from idlescape.character import Character
+from idlescape.fishing import Fishing
+
+# (zone_level, min_base, max_base, fishing_level, bait_power)
+NODE_PARAMETERS = [(1, 5, 10, 1, 0), (20, 5, 10, 90, 40), (60, 2, 4, 150, 120), (85, 1, 3, 70, 10)]
+
+
+@pytest.mark.parametrize("parameters", NODE_PARAMETERS)
+def test_node_size_pmf_matches_sampling(parameters):
+    sizes, probabilities = fishing._node_size_pmf_fishing(*parameters)
+    assert np.all(probabilities >= 0)
+    assert np.sum(probabilities) == pytest.approx(1.0)
+    samples = fishing._sample_node_resources_numpy_fishing(*parameters, 200000, 1)
+    assert np.mean(samples) == pytest.approx(np.dot(sizes, probabilities), abs=5 * np.std(samples) / np.sqrt(200000))
+    # Every sampled size has a probability and the frequencies agree
+    values, counts = np.unique(samples, return_counts=True)
+    assert np.all(np.isin(values, sizes))
+    expected = np.array([probabilities[sizes == value].sum() for value in values])
+    assert np.max(np.abs(counts / len(samples) - expected)) < 0.01
+
+
+def test_average_node_size_exact_and_monte_carlo(locations):
+    player = Character(fishing_level=90, fishing_bonus=30, bait_power=40)
+    exact = Fishing(player, locations)
+    simulated = Fishing(player, locations, monte_carlo=True, accuracy=100000, seed=3)
+    for name in exact.list_of_actions()[:3]:
+        location = exact.get_location_by_name(name)
+        for node in location.nodes.values():
+            assert simulated._average_node_size(location, node) == pytest.approx(
+                exact._average_node_size(location, node), rel=0.02)
+
+
+@pytest.fixture
+def backend():
+    previous = fishing.get_backend()
+    yield fishing.set_backend
+    fishing.set_backend(previous)
+
+
+def _sample_with_workers(parameters, trials, workers):
+    # Worker processes for numpy, threads for numba
+    if fishing.get_backend() != "numba":
+        return fishing._sample_node_resources_fishing(*parameters, trials, 7, parallel=True, workers=workers)
+    import numba
+    threads = numba.get_num_threads()
+    numba.set_num_threads(min(workers, numba.config.NUMBA_NUM_THREADS))
+    try:
+        return fishing._sample_node_resources_fishing(*parameters, trials, 7, parallel=True)
+    finally:
+        numba.set_num_threads(threads)
+
+
+@pytest.mark.parametrize("name", ["numba", "numpy"])
+def test_parallel_sampling_does_not_depend_on_workers(backend, name):
+    if name not in fishing.available_backends():
+        pytest.skip(f"{name} is not available")
+    backend(name)
+    parameters = NODE_PARAMETERS[1]
+    small = [_sample_with_workers(parameters, 5000, workers) for workers in (1, 2)]
+    assert np.array_equal(small[0], small[1])
+    if name == "numpy":
+        # Large batches go through the process pool
+        trials = fishing._POOL_MIN_TRIALS
+        large = [_sample_with_workers(parameters, trials, workers) for workers in (1, 2)]
+        assert np.array_equal(large[0], large[1])
+    sizes, probabilities = fishing._node_size_pmf_fishing(*parameters)
+    assert np.mean(small[0]) == pytest.approx(np.dot(sizes, probabilities), rel=0.02)
+
+
+@pytest.mark.parametrize("name", fishing.available_backends())
+@pytest.mark.parametrize("parameters", NODE_PARAMETERS[1:3])
+def test_backends_agree_with_the_exact_model(backend, name, parameters):
+    backend(name)
+    (zone_level, min_base, max_base, fishing_level, bait_power) = parameters
+    sizes, probabilities = fishing._node_size_pmf_fishing(*parameters)
+    node_size = fishing._calculate_node_resources_jit_fishing(*parameters, 200000, seed=5)
+    assert node_size == pytest.approx(np.dot(sizes, probabilities), rel=0.01)
+    base_chance = 0.4 + (fishing_level - zone_level * 1.25) / 275 + bait_power / 200
+    exact_tries = fishing._expected_node_grid_numpy_fishing(
+        zone_level, min_base, max_base, np.array([fishing_level], dtype=float), np.array([bait_power], dtype=float),
+        np.array([base_chance]), True)[0]
+    tries = fishing._average_tries_to_finish_node_jit_fishing(base_chance, *parameters, 0, 200000, seed=5)
+    assert tries == pytest.approx(exact_tries, rel=0.01)
+
+
+def test_zone_action_rate_grid_matches_scalar_rates(locations):
+    base = dict(fishing_level=60, fishing_bonus=10, bait_power=20, reel_power=15, enchantments={'haste': 2})
+    action = Fishing(Character(**base), locations)
+    levels = np.array([1, 35, 90, 160])
+    bonuses = np.array([0, 25, 60])
+    for name in action.list_of_actions()[::3]:
+        grid = action.zone_action_rate_grid(name, fishing_level=levels[:, None], fishing_bonus=bonuses[None, :])
+        assert grid.shape == (len(levels), len(bonuses))
+        expected = [[Fishing(Character(**dict(base, fishing_level=level, fishing_bonus=bonus)),
+                             locations).zone_action_rate(name) for bonus in bonuses] for level in levels]
+        np.testing.assert_allclose(grid, expected, rtol=1e-10)
+
+
+def _normal_draw(trials, seed):
+    return np.random.default_rng(seed).normal(10.0, 2.0, trials)
+
+
+def test_adaptive_estimate_stops_at_the_requested_error():
+    mean, standard_error, trials = fishing._adaptive_estimate(_normal_draw, seed=1, relative_error=0.002,
+                                                              max_trials=10 ** 7)
+    assert standard_error <= 0.002 * abs(mean)
+    assert 1000 < trials < 10 ** 7
+    # Batches double from 1000, stopping at the previous total had not reached the error yet
+    previous = fishing._adaptive_estimate(_normal_draw, seed=1, relative_error=0.002, max_trials=(trials - 1000) // 2)
+    assert previous[1] > 0.002 * abs(previous[0])
+    assert mean == pytest.approx(10.0, abs=5 * standard_error)
+    assert fishing._adaptive_estimate(_normal_draw, seed=1, relative_error=0.002, max_trials=10 ** 7) == (
+        mean, standard_error, trials)
+
+
+def test_adaptive_estimate_time_budget_and_trial_cap():
+    mean, standard_error, trials = fishing._adaptive_estimate(_normal_draw, seed=2, time_budget=1e-9,
+                                                              max_trials=10 ** 7)
+    assert trials == 1000
+    assert np.isfinite(standard_error)
+    assert fishing._adaptive_estimate(_normal_draw, seed=2, max_trials=5000)[2] == 5000
+
+
+def _enumerated_node_size_pmf(zone_level, min_base, max_base, fishing_level, bait_power, points=12):
+    # Midpoints of every uniform draw on a grid, exact when the floor boundaries fall on multiples of 1/points
+    grid = (np.arange(points) + 0.5) / points
+    (u1, u2, u3, u4) = [value.ravel() for value in np.meshgrid(grid, grid, grid, grid, indexing='ij')]
+    level_delta = fishing_level - zone_level
+    maximum = np.floor(max_base + u1 * level_delta / 8) + np.floor(u2 * bait_power / 20)
+    minimum = np.floor(min_base + u3 * level_delta / 6) + np.floor(u4 * bait_power / 10)
+    lucky_chance = 0.05 + bait_power / 2000
+    pmf = dict()
+    for (weight, maximum, minimum) in ((1 - lucky_chance, maximum, minimum),
+                                       (lucky_chance, maximum * 3.0, minimum * 1.5)):
+        (pairs, counts) = np.unique(np.stack([maximum, minimum], axis=1), axis=0, return_counts=True)
+        for ((high, low), count) in zip(pairs, counts):
+            # Last draw floor(U * (delta + 1) + small) in closed form
+            delta = abs(high - low)
+            small = min(high, low)
+            for size in range(int(np.floor(small)), int(np.floor(small + delta + 1)) + 1):
+                chance = (np.clip((size + 1 - small) / (delta + 1), 0, 1)
+                          - np.clip((size - small) / (delta + 1), 0, 1))
+                pmf[size] = pmf.get(size, 0) + weight * chance * count / len(u1)
+    return pmf
+
+
+@pytest.mark.parametrize("parameters", [(20, 5, 10, 44, 40), (20, 3, 7, 32, 30), (10, 1, 2, 10, 0)])
+def test_node_size_pmf_matches_enumeration(parameters):
+    sizes, probabilities = fishing._node_size_pmf_fishing(*parameters)
+    expected = _enumerated_node_size_pmf(*parameters)
+    pmf = dict()
+    for (size, probability) in zip(sizes, probabilities):
+        pmf[size] = pmf.get(size, 0) + probability
+    sizes = sorted(set(pmf) | {size for (size, probability) in expected.items() if probability > 1e-15})
+    np.testing.assert_allclose([pmf.get(size, 0) for size in sizes], [expected.get(size, 0) for size in sizes],
+                               atol=1e-12)
+
+
+def _summed_tries(base_chance, fishing_bonus, node_size):
+    # The per-size loop the prefix-sum table replaced
+    return sum(1 / min(1.0, base_chance + fishing_bonus * 0.025 + n_res / 48) for n_res in range(node_size, 0, -1))
+
+
+@pytest.mark.parametrize("base_chance, fishing_bonus", [(0.02, 0), (0.1, 0), (0.45, 2), (0.99, 4), (1.5, 0)])
+def test_tries_table_matches_the_summed_odds(base_chance, fishing_bonus):
+    table = fishing._tries_to_finish_table(base_chance, fishing_bonus)
+    assert not table.flags.writeable
+    node_sizes = np.arange(0, 150)
+    expected = [_summed_tries(base_chance, fishing_bonus, size) for size in node_sizes]
+    np.testing.assert_allclose(fishing._tries_to_finish_node(table, node_sizes), expected, rtol=1e-12)
+    if fishing.numba_available:
+        np.testing.assert_allclose(fishing._tries_to_finish_parallel_jit_fishing(table, node_sizes.astype(float)),
+                                   expected, rtol=1e-12)
+
+
+@pytest.mark.parametrize("name", fishing.available_backends())
+@pytest.mark.parametrize("parallel", [False, True])
+def test_backends_sample_the_same_distribution(backend, name, parallel):
+    backend(name)
+    parameters = NODE_PARAMETERS[1]
+    samples = fishing._sample_node_resources_fishing(*parameters, 100000, 11, parallel=parallel)
+    assert np.array_equal(samples, fishing._sample_node_resources_fishing(*parameters, 100000, 11, parallel=parallel))
+    sizes, probabilities = fishing._node_size_pmf_fishing(*parameters)
+    values, counts = np.unique(samples, return_counts=True)
+    assert np.all(np.isin(values, sizes))
+    expected = np.array([probabilities[sizes == value].sum() for value in values])
+    assert np.max(np.abs(counts / len(samples) - expected)) < 0.01
+    assert np.mean(samples) == pytest.approx(np.dot(sizes, probabilities), rel=0.01)
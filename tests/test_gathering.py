@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+from idlescape import datastore
+from idlescape.character import Character
+from idlescape.fishing import Fishing
+from idlescape.foraging import Foraging
+from idlescape.gathering import Location, Node, NodeLoot
+from idlescape.mining import Mining
+
+ENCHANTMENTS = [{}, {'gathering': 3}, {'gathering': 4, 'empoweredGathering': 2}, {'superheating': 20},
+                {'superheating': 30, 'empoweredSuperheating': 10, 'gathering': 2}, {'embers': 3},
+                {'embers': 2, 'gathering': 1, 'empoweredGathering': 3}]
+
+
+def _reference_loot_rates(action, node):
+    # The per-node formula _loot_rates replaced
+    count = dict()
+    gathering = min(1, action.get_enchant("gathering") * 0.10)
+    empowered_gathering = min(1, action.get_enchant("empoweredGathering") * 0.10)
+    total_gathering = 1 - (1 - gathering) * (1 - empowered_gathering)
+    superheat = min(1, action.get_enchant("superheating") * 0.01)
+    empowered_superheat = min(1, action.get_enchant("empoweredSuperheating") * 0.01)
+    total_superheat = 1 - (1 - superheat) * (1 - empowered_superheat)
+    embers = action.get_enchant("embers") * 0.1
+    frequencies = {idd: max(0, min(loot.frequency, loot.max_frequency)) for (idd, loot) in node.loot.items()}
+    total_frequency = sum(frequencies.values())
+    for (idd, loot) in node.loot.items():
+        frequency = frequencies[idd] / total_frequency
+        count[idd] = count.get(idd, 0) + ((loot.min_amount + loot.max_amount) / 2 + total_gathering
+                                          - total_superheat) * frequency
+        if (total_superheat > 0) and (idd in action.sh_table):
+            sh_id = action.sh_table[idd]
+            sh_count = total_superheat * frequency
+            count[sh_id] = count.get(sh_id, 0) + sh_count
+            heat = action.items[str(sh_id)].get('requiredResources', [{}])[0].get('2', 0)
+            count[2] = count.get(2, 0) - sh_count * 1.5 * heat
+            count[512] = count.get(512, 0) - frequency * superheat * (1 - empowered_superheat)
+        if embers > 0:
+            count[2] = count.get(2, 0) + action.items[str(idd)].get('heat', 0) * embers * frequency
+        if gathering > 0:
+            count[517] = count.get(517, 0) - frequency * gathering * 0.15 * (1 - empowered_gathering)
+    return count
+
+
+@pytest.mark.parametrize("action_class", [Mining, Foraging])
+@pytest.mark.parametrize("enchantments", ENCHANTMENTS)
+def test_loot_rates_match_the_per_node_formula(locations, action_class, enchantments):
+    action = action_class(Character(enchantments=enchantments), locations)
+    for name in action.list_of_actions():
+        location = action.get_location_by_name(name)
+        item_ids, rates = action._loot_rates(location)
+        assert len(set(item_ids.tolist())) == len(item_ids)
+        for (row, node_id) in enumerate(action._zone_table(location).node_ids):
+            expected = _reference_loot_rates(action, location.nodes[node_id])
+            assert set(expected) <= set(item_ids.tolist())
+            np.testing.assert_allclose(rates[row], [expected.get(idd, 0) for idd in item_ids], atol=1e-12)
+
+
+@pytest.mark.parametrize("action_class", [Mining, Foraging, Fishing])
+@pytest.mark.parametrize("options", [{}, {'key': 'id'}, {'interval': 'hour'}])
+def test_all_location_histograms_match_each_zone(locations, action_class, options):
+    player = Character(mining_level=80, foraging_level=80, fishing_level=80, bait_power=20,
+                       enchantments={'gathering': 2, 'superheating': 10, 'embers': 1})
+    action = action_class(player, locations)
+    table = action.all_location_histograms(**options)
+    assert list(table.index) == action.list_of_actions()
+    for name in action.list_of_actions():
+        histogram = action.location_item_histogram(name, **options)
+        row = table.loc[name]
+        np.testing.assert_allclose(row[histogram.index].to_numpy(dtype=float), histogram.to_numpy(dtype=float))
+        assert np.all(row.drop(histogram.index) == 0)
+
+
+def _eager_nodes(location_data, item_data):
+    # Nodes built straight from the json, as every location did before construction was lazy
+    node_list = location_data.get("nodes", [{"nodeID": "", "frequency": 1, "minimumBaseAmount": 1,
+                                             "loot": location_data.get("loot", [])}])
+    nodes = dict()
+    for node in node_list:
+        loot = dict()
+        for item in node["loot"]:
+            loot[item["id"]] = (item.get("frequency", 1), item.get("maxFrequency", item.get("frequency", 1)),
+                                item.get("minAmount", 1), item.get("maxAmount", item.get("minAmount", 1)),
+                                item_data[str(item["id"])].get("class", ""))
+        frequency = node.get("frequency", 1)
+        minimum = node.get("minimumBaseAmount", 1)
+        nodes[node["nodeID"]] = (frequency, node.get("maxFrequency", frequency), minimum,
+                                 node.get("maximumBaseAmount", minimum), list(node.get("tags", [])), loot)
+    return nodes
+
+
+@pytest.mark.parametrize("action_class", [Mining, Foraging, Fishing])
+def test_lazy_nodes_match_eager_construction(locations, action_class):
+    action = action_class(Character(), locations)
+    raw = {v['name']: v for v in datastore.load_json(locations).values() if v['actionType'] == action.action_name}
+    assert set(raw) == set(action.list_of_actions())
+    for (name, location) in action.locations.items():
+        assert location._nodes is None
+        built = {node_id: (node.frequency, node.max_frequency, node.minimum_base_amount, node.maximum_base_amount,
+                           list(node.tags), {idd: (loot.frequency, loot.max_frequency, loot.min_amount,
+                                                   loot.max_amount, loot.item_class)
+                                             for (idd, loot) in node.loot.items()})
+                 for (node_id, node) in location.nodes.items()}
+        assert built == _eager_nodes(raw[name], action.items)
+        assert location._node_data is None
+        assert location.nodes is location.nodes
+
+
+def test_zone_classes_have_no_instance_dict():
+    for instance in (Location("a", 1, "Action-Mining", 1000, 1, 10), Node("n", 1, 1, 1, 1, []),
+                     NodeLoot(1, 1, 1, 1, 1, "")):
+        assert not hasattr(instance, "__dict__")
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from idlescape import datastore
+from idlescape.character import select_items
+from idlescape.itemtable import ItemTable
+
+
+@pytest.fixture
+def item_data():
+    return select_items(datastore.data_file("items.json"))
+
+
+def test_table_is_attached_to_the_data(item_data):
+    table = ItemTable.for_items(item_data)
+    assert ItemTable.for_items(item_data) is table
+    plain = {"1": {"name": "a"}}
+    assert ItemTable.for_items(plain) is not ItemTable.for_items(plain)
+
+
+def test_rows_match_the_item_data(item_data):
+    table = ItemTable.for_items(item_data)
+    ids = [int(k) for k in list(item_data.keys())[::25]]
+    rows = table.rows(ids)
+    assert list(table.ids[rows]) == ids
+    assert list(table.name_of(ids)) == [item_data[str(idd)]['name'] for idd in ids]
+    assert np.array_equal(table.rows_by_name(table.name_of(ids)), rows)
+
+
+def test_unknown_ids_and_names_raise(item_data):
+    table = ItemTable.for_items(item_data)
+    missing = int(table.ids.max()) + 1
+    with pytest.raises(KeyError):
+        table.rows([int(table.ids[0]), missing])
+    with pytest.raises(KeyError):
+        table.name_of([-1])
+    with pytest.raises(KeyError):
+        table.rows_by_name(["Not an item"])
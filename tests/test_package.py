@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+import pytest
+import idlescape
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _loaded_after(code):
+    # Heavy packages imported by running code in a fresh interpreter
+    probe = (f"import sys\n{code}\n"
+             "print(' '.join(sorted({m.split('.')[0] for m in sys.modules} & {'panel', 'hvplot', 'numba'})))")
+    result = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, capture_output=True, text=True, check=True)
+    return set(result.stdout.split())
+
+
+@pytest.mark.parametrize("code, loaded", [
+    ("import idlescape", set()),
+    ("import idlescape\nidlescape.Character()", set()),
+    ("import idlescape\nidlescape.Mining", set()),
+    ("from idlescape import *", {"numba"}),
+    ("import idlescape\nidlescape.Fishing", {"numba"}),
+])
+def test_package_imports_lazily(code, loaded):
+    assert _loaded_after(code) == loaded
+
+
+def test_lazy_attributes_resolve():
+    from idlescape.character import Character
+    from idlescape.combat import CombatantBatch
+    assert idlescape.Character is Character
+    assert idlescape.CombatantBatch is CombatantBatch
+    assert idlescape.datastore.data_file("items.json").endswith("items.json")
+    assert "Fishing" in dir(idlescape)
+    assert "InteractiveCharacter" not in idlescape.__all__
+    with pytest.raises(AttributeError):
+        idlescape.not_a_module
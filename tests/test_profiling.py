@@ -0,0 +1,71 @@
+import pytest
+from idlescape import datastore, profiling
+from idlescape.character import Character
+from idlescape.mining import Mining
+
+
+@profiling.instrument
+def _bare(value):
+    return value * 2
+
+
+@profiling.instrument("tests.named")
+def _named(value):
+    if value < 0:
+        raise ValueError(value)
+    return value
+
+
+@pytest.fixture(autouse=True)
+def restore_profiling():
+    previous = profiling.enabled()
+    yield
+    profiling.reset()
+    (profiling.enable if previous else profiling.disable)()
+
+
+def test_nothing_is_recorded_when_disabled():
+    profiling.disable()
+    profiling.reset()
+    assert _bare(2) == 4
+    profiling.cache("tests.cache", True)
+    with profiling.timer("tests.block"):
+        pass
+    assert profiling.statistics() == {}
+
+
+def test_decorators_timers_and_caches_record():
+    profiling.disable()
+    with profiling.profile():
+        assert [_bare(i) for i in range(3)] == [0, 2, 4]
+        _named(1)
+        with pytest.raises(ValueError):
+            _named(-1)
+        with profiling.timer("tests.block"):
+            pass
+        for hit in (True, True, False):
+            profiling.cache("tests.cache", hit)
+    assert not profiling.enabled()
+    stats = profiling.statistics()
+    assert stats[_bare.__qualname__]["calls"] == 3
+    # Calls that raise are still counted
+    assert stats["tests.named"]["calls"] == 2
+    assert stats["tests.block"]["calls"] == 1
+    assert stats["tests.block"]["total_time"] >= 0
+    assert (stats["tests.cache"]["hits"], stats["tests.cache"]["misses"]) == (2, 1)
+    assert stats["tests.cache"]["hit_rate"] == pytest.approx(2 / 3)
+    frame = profiling.statistics_frame()
+    assert set(frame.index) == set(stats)
+
+
+def test_model_entry_points_are_instrumented(locations):
+    mining = Mining(Character(mining_level=60), locations)
+    name = mining.list_of_actions()[0]
+    with profiling.profile():
+        mining.location_item_histogram(name)
+        mining.location_item_histogram(name)
+        datastore.load_json(locations)
+    stats = profiling.statistics()
+    assert stats["Gathering.location_item_histogram"]["calls"] == 2
+    assert stats["Gathering._node_statistics"]["hits"] >= 1
+    assert stats["datastore.load_json"]["hits"] >= 1
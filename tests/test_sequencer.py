@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from idlescape.character import Character
+from idlescape.fishing import Fishing
+from idlescape.foraging import Foraging
+from idlescape.mining import Mining
+from idlescape.sequencer import ExperienceTable, RSExperienceTable, Sequencer, run_scenarios
+
+SEQUENCE = [
+    {'level': 20, 'mining_bonus': 20, 'foraging_bonus': 20, 'fishing_bonus': 20, 'info': 'tool'},
+    {'level': 45, 'bait_power': 30, 'info': 'bait'},
+    {'hours': 30, 'enchantments:haste': 3, 'info': 'haste scroll'},
+]
+
+
+@pytest.mark.parametrize("action_class", [Mining, Foraging, Fishing])
+def test_event_and_step_modes_agree(locations, action_class):
+    time_axis = np.linspace(0, 120, 241)
+    results = []
+    for mode in ('step', 'event'):
+        sequencer = Sequencer(action_class(Character(), locations), sequence=SEQUENCE)
+        results.append(sequencer.simulate_by_time(time_axis, mode=mode))
+    (step_levels, step_rates, step_log), (event_levels, event_rates, event_log) = results
+    assert np.array_equal(step_levels, event_levels)
+    assert np.allclose(step_rates, event_rates)
+    assert step_log == event_log
+    # The events did change the curve
+    plain = Sequencer(action_class(Character(), locations)).simulate_by_time(time_axis)
+    assert event_levels[-1] > event_levels[0]
+    assert not np.allclose(plain[1], event_rates)
+
+
+@pytest.mark.parametrize("table_class", [ExperienceTable, RSExperienceTable])
+def test_experience_table_lookups(table_class):
+    table = table_class()
+    levels = np.arange(1, 200)
+    experience = table.experience(levels)
+    assert np.array_equal(experience, [table.experience(int(level)) for level in levels])
+    assert np.array_equal(table.level(experience), levels)
+    assert np.array_equal(table.level(experience[1:] - 1), levels[:-1])
+    assert table.experience(10.5) == pytest.approx((experience[9] + experience[10]) / 2)
+    assert table.level((experience[9] + experience[10]) / 2, fractional=True) == pytest.approx(10.5)
+
+
+@pytest.mark.parametrize("level", [0, 200, -1, 0.5, 199.5, [5, 250]])
+def test_levels_outside_the_table_raise(level):
+    with pytest.raises(ValueError):
+        ExperienceTable().experience(level)
+
+
+def test_negative_experience_raises():
+    with pytest.raises(ValueError):
+        ExperienceTable().level(-1)
+
+
+def test_run_scenarios_in_workers_matches_in_process():
+    scenarios = [{'skill': skill, 'time_axis': np.linspace(0, 40, 9), 'sequence': SEQUENCE}
+                 for skill in ('mining', 'foraging', 'fishing')]
+    scenarios.append({'name': 'strong', 'skill': 'mining', 'time_axis': np.linspace(0, 40, 9),
+                      'character': {'mining_bonus': 40}})
+    in_process = run_scenarios(scenarios, workers=1)
+    pooled = run_scenarios(scenarios, workers=2)
+    assert list(in_process['scenario'].unique()) == [0, 1, 2, 'strong']
+    assert in_process.equals(pooled)
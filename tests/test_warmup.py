@@ -0,0 +1,46 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+import idlescape
+from idlescape import fishing
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WARM_CALLS = """
+import json
+import numpy as np
+import idlescape
+from idlescape import bench, combat, fishing
+idlescape.warmup(background=False)
+kernels = [fishing._sample_node_resources_jit_fishing, fishing._sample_node_resources_parallel_jit_fishing,
+           fishing._tries_to_finish_parallel_jit_fishing, fishing._expected_node_grid_jit_fishing,
+           combat._simulate_encounters_jit]
+warm = [len(kernel.signatures) for kernel in kernels]
+for parallel in (False, True):
+    action = fishing.Fishing(bench._character(), bench._locations(), monte_carlo=True, accuracy=2000, seed=1,
+                             parallel=parallel)
+    for name in action.list_of_actions()[:2]:
+        action.zone_action_rate(name)
+action.zone_action_rate_grid(action.list_of_actions()[0], fishing_level=np.arange(1, 100, 20))
+combat.Combat().simulate_encounters(combat.Combatant(), combat.Combatant(), fights=100, seed=1)
+print(json.dumps([warm, [len(kernel.signatures) for kernel in kernels]]))
+"""
+
+
+@pytest.mark.skipif(not fishing.numba_available, reason="numba is not installed")
+def test_warmup_compiles_what_real_calls_use():
+    result = subprocess.run([sys.executable, "-c", WARM_CALLS], cwd=ROOT, capture_output=True, text=True, check=True)
+    (warm, used) = json.loads(result.stdout.strip().splitlines()[-1])
+    assert warm == [1] * len(warm)
+    # Real calls reuse the versions warmup compiled instead of compiling new ones
+    assert used == warm
+
+
+def test_warmup_in_the_background():
+    thread = idlescape.warmup()
+    if thread is not None:
+        thread.join(timeout=300)
+        assert not thread.is_alive()
+    assert idlescape.warmup(background=False) is None